@@ -8,6 +8,7 @@ import math
 import threading
 import tkinter as tk
 from tkinter import filedialog
+from mux_core import SerialLineReader
 
 #  Settings 
 serialPort = "/dev/tty.usbserial-110"
@@ -28,6 +29,7 @@ try:
 except Exception as e:
     print(f"[ERROR] Could not open serial port: {e}")
     exit()
+reader = SerialLineReader(ser)  # drains in_waiting in bulk instead of readline()'s per-byte reads
 
 #  Data Buffers 
 start_time = time.time()
@@ -121,7 +123,7 @@ def serial_worker():
     global logging_enabled, csv_writer, csv_file
     while True:
         try:
-            raw_line = ser.readline().decode(errors="ignore").strip()
+            raw_line = reader.read_line().decode(errors="ignore").strip()
             if not raw_line: continue
             
             # Expects "val0,val1,val2...val15"
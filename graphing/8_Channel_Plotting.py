@@ -1,32 +1,23 @@
-import csv
 import matplotlib.pyplot as plt
 import numpy as np
+import pandas as pd
 from cmcrameri import cm  # cmcrameri colormaps
 
 file = 'data'
 csvfilename = 'FDC2214_Force_Test_CH5_CH6.csv'
 file_path = f"{file}/{csvfilename}"
-times = []
 Max_Channel = 9
-channels = {i: [] for i in range(1, Max_Channel)}  # raw channels 1–8
 
-with open(file_path, 'r') as infile:
-    csvreader = csv.reader(infile)
-    next(csvreader)  # skip header
-    for row in csvreader:
-        try:
-            times.append(float(row[0]))
-            for i in range(1, Max_Channel):
-                channels[i].append(float(row[i]))
-        except (ValueError, IndexError):
-            times.append(float('nan'))
-            for i in range(1, Max_Channel):
-                channels[i].append(np.nan)
+# Read in pandas' C parser; a row with a bad or missing cell becomes all NaN (a gap in the plot)
+df = pd.read_csv(file_path, on_bad_lines='skip')
+cols = df.iloc[:, :Max_Channel].apply(pd.to_numeric, errors='coerce').to_numpy()
+values = np.full((len(cols), Max_Channel), np.nan)
+values[:, :cols.shape[1]] = cols  # channels a narrower log does not have stay all NaN
+values[np.isnan(cols).any(axis=1)] = np.nan
 
-# Convert to numpy arrays
-times = np.array(times)
-for i in range(1, Max_Channel):
-    channels[i] = np.array(channels[i])
+# Column views, no copies
+times = values[:, 0]
+channels = {i: values[:, i] for i in range(1, Max_Channel)}  # raw channels 1–8
 
 # Custom legend remapping
 label_map = {
@@ -1,56 +1,40 @@
-import csv
-from collections import defaultdict
-import math
-import statistics
+import numpy as np
+import pandas as pd
 import matplotlib.pyplot as plt
 
-# data[channel][time_bin] = list of measurements
-data = [defaultdict(list) for _ in range(4)]
-
 start_time = 0
 file_name = 'FDC2214_Distance_Test_2.csv'
 channel_count = 1
 
-with open(file_name, 'r') as file:
-    
-    csvreader = csv.reader(file)
-    next(csvreader)  
-    for row in csvreader:
-        try:
-            time = float(row[0])
-            if time > start_time:
-                time_bin = math.floor(time)
-                for ch in range(channel_count):
-                    measurement = float(row[ch + 1])
-                    data[ch][time_bin].append(measurement)
-        except (ValueError, IndexError):
-            continue
+# Unparseable cells become NaN instead of raising
+df = pd.read_csv(file_name, memory_map=True).apply(pd.to_numeric, errors='coerce')
+times = df.iloc[:, 0]
+df = df[times > start_time]
+time_bins = np.floor(df.iloc[:, 0].to_numpy()).astype(np.int64)
+first_bin = time_bins.min() if time_bins.size else 0
 
-filtered_averages = [{} for _ in range(channel_count)]
+# filtered_averages[ch] = Series of per-second means after dropping points outside mean ± 2σ
+filtered_averages = []
 
 for ch in range(channel_count):
-    for time_bin, values in data[ch].items():
-        if len(values) < 2:
-            continue
-        mean = statistics.mean(values)
-        stdev = statistics.stdev(values)
-        filtered_values = [v for v in values if (mean - 2 * stdev) <= v <= (mean + 2 * stdev)]
-        if filtered_values:
-            filtered_avg = sum(filtered_values) / len(filtered_values)
-            filtered_averages[ch][time_bin] = filtered_avg
-
-# Write output for each channel
-with open('CLEAN4.csv', 'w', newline='') as outfile:
-    csvwriter = csv.writer(outfile)
-    csvwriter.writerow(['Time', 'Ch0_Avg', 'Ch1_Avg', 'Ch2_Avg', 'Ch3_Avg'])
-
-    # Get all unique time bins across all channels, sorted
-    all_time_bins = sorted(set().union(*[fa.keys() for fa in filtered_averages]))
-    for time_bin in all_time_bins:
-        row = [time_bin]
-        for ch in range(channel_count):
-            row.append(filtered_averages[ch].get(time_bin, ''))
-        csvwriter.writerow(row)
-
-
-
+    values = df.iloc[:, ch + 1].to_numpy()
+    valid = ~np.isnan(values)
+    values, idx = values[valid], time_bins[valid] - first_bin
+
+    # Per-bin count, mean and sample stdev, all from np.bincount sums
+    counts = np.bincount(idx)
+    mean = np.bincount(idx, weights=values) / np.maximum(counts, 1)
+    dev = values - mean[idx]
+    stdev = np.sqrt(np.bincount(idx, weights=dev * dev) / np.maximum(counts - 1, 1))
+    keep = (counts[idx] >= 2) & (np.abs(dev) <= 2 * stdev[idx])  # single-sample bins are dropped
+
+    kept_counts = np.bincount(idx[keep], minlength=counts.size)
+    kept_sums = np.bincount(idx[keep], weights=values[keep], minlength=counts.size)
+    has = kept_counts > 0
+    filtered_averages.append(pd.Series(kept_sums[has] / kept_counts[has], index=np.flatnonzero(has) + first_bin))
+
+# Write output for each channel; time bins missing for a channel are left blank
+out = pd.DataFrame({f'Ch{ch}_Avg': filtered_averages[ch] if ch < channel_count else pd.Series(dtype=float)
+                    for ch in range(4)})
+out.index.name = 'Time'
+out.sort_index().to_csv('CLEAN4.csv', na_rep='')
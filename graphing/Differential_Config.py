@@ -8,6 +8,7 @@ import time
 import threading
 import tkinter as tk
 from tkinter import filedialog
+from mux_core import SerialLineReader
 # from cmcrameri import cmr
 
 
@@ -27,6 +28,7 @@ for i in range(channel_num):
 
 # Serial setup
 ser = serial.Serial(serialPort, baudrate=baudrate, timeout=1)
+reader = SerialLineReader(ser)  # drains in_waiting in bulk instead of readline()'s per-byte reads
 
 
 buffer_len = 100
@@ -124,7 +126,7 @@ def serial_worker():
     global logging_enabled, csv_writer, csv_file
     while True:
         try:
-            raw_line = ser.readline().decode(errors="ignore").strip()
+            raw_line = reader.read_line().decode(errors="ignore").strip()
             if not raw_line:
                 continue
             parts = raw_line.split(",")
@@ -1,9 +1,9 @@
 import serial
 import numpy as np
 import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
-from collections import deque
+from matplotlib.transforms import Bbox
 import sys
+from mux_core import SerialLineReader, parse_frame
 
 # Configuration
 SERIAL_PORT = 'COM9'  # Change this to your Arduino port
@@ -11,12 +11,31 @@ BAUD_RATE = 115200
 NUM_ROWS = 8
 NUM_COLS = 8
 HISTORY_LENGTH = 100  # Number of frames to display
+HEADER = b"Row_index,Column_index,Raw_Cap_Row,Raw_Cap_Column"
+HEADER_TIMEOUT = 10  # Seconds to wait for the header before streaming anyway
+FRAME_INTERVAL_MS = 50
+RESCALE_FRAMES = 20  # Recompute y-limits from the full window every ~1 s (20 x 50 ms) so they can shrink
+WARMUP_FRAMES = 40  # After ~2 s the y-limits freeze and only widen when data leaves them
+FROZEN_PAD = 0.10  # Headroom kept around the data once frozen, so widening is rare
 
-# Initialize data storage (keep history of readings)
-row_history = [deque(maxlen=HISTORY_LENGTH) for _ in range(NUM_ROWS * NUM_COLS)]
-col_history = [deque(maxlen=HISTORY_LENGTH) for _ in range(NUM_ROWS * NUM_COLS)]
+# Reused parse buffer: Row_index, Column_index, Raw_Cap_Row, Raw_Cap_Column (+1 spare to reject extras)
+codes = np.empty(5, dtype=np.int64)
+
+# Shared x-axis, set once per line; slots not filled yet are drawn as NaN (gaps)
+X_FULL = np.arange(HISTORY_LENGTH)
+
+# Initialize data storage: one ring row per node, written at sample_counts[idx] % HISTORY_LENGTH
+NUM_NODES = NUM_ROWS * NUM_COLS
+row_buf = np.zeros((NUM_NODES, HISTORY_LENGTH), dtype=np.int32)  # raw 28-bit codes fit in int32
+col_buf = np.zeros((NUM_NODES, HISTORY_LENGTH), dtype=np.int32)
+sample_counts = np.zeros(NUM_NODES, dtype=np.int64)
+drawn_counts = np.zeros(NUM_NODES, dtype=np.int64)  # sample count each line was last drawn at
 frame_count = 0
 
+# Running y-limits per subplot, widened as samples arrive instead of relim() every frame
+row_min, row_max = float('inf'), float('-inf')
+col_min, col_max = float('inf'), float('-inf')
+
 # Setup serial connection
 try:
     ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1)
@@ -25,18 +44,17 @@ except Exception as e:
     print(f"Error opening serial port: {e}")
     sys.exit(1)
 
-# Skip initial messages until we get to the header
-while True:
-    line = ser.readline().decode('utf-8').strip()
-    if line == "Row_index,Column_index,Raw_Cap_Row,Raw_Cap_Column":
-        print("Found header, starting data collection...")
-        break
-    if "FDC" in line:
-        print(line)
+reader = SerialLineReader(ser)
+
+# Skip initial messages until we get to the header (bulk byte reads, bounded wait)
+if reader.wait_for(HEADER, HEADER_TIMEOUT, echo=b"FDC"):
+    print("Found header, starting data collection...")
+else:
+    print(f"Header not seen within {HEADER_TIMEOUT} s, starting data collection anyway...")
 
 # Create figure with two subplots
 fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10))
-fig.suptitle('Real-time Capacitance Monitoring', fontsize=16)
+title = fig.suptitle('Real-time Capacitance Monitoring', fontsize=16, animated=True)
 
 # Setup row capacitance plot
 ax1.set_title('Row Capacitance Over Time')
@@ -62,8 +80,8 @@ for i in range(NUM_ROWS * NUM_COLS):
     col_idx = i % NUM_COLS
     label = f'R{row_idx}C{col_idx}'
     
-    line_r, = ax1.plot([], [], label=label, color=colors[i], alpha=0.7, linewidth=1)
-    line_c, = ax2.plot([], [], label=label, color=colors[i], alpha=0.7, linewidth=1)
+    line_r, = ax1.plot(X_FULL, np.full(HISTORY_LENGTH, np.nan), label=label, color=colors[i], alpha=0.7, linewidth=1, animated=True)
+    line_c, = ax2.plot(X_FULL, np.full(HISTORY_LENGTH, np.nan), label=label, color=colors[i], alpha=0.7, linewidth=1, animated=True)
     
     lines_row.append(line_r)
     lines_col.append(line_c)
@@ -74,64 +92,135 @@ for i in range(NUM_ROWS * NUM_COLS):
 
 plt.tight_layout()
 
-def update(frame):
-    """Update function for animation"""
-    global frame_count
+# Blitting: the lines and the frame-counter title are animated, so full draws leave them out and
+# only the axes and the strip above ax1 are cached
+backgrounds = None
+title_bbox = None
+
+def on_draw(event):
+    """After every full draw (rescale, resize): recapture the backgrounds and paint the animated artists"""
+    global backgrounds, title_bbox
+    title_bbox = Bbox.from_extents(fig.bbox.x0, ax1.bbox.y1, fig.bbox.x1, fig.bbox.y1)
+    backgrounds = [fig.canvas.copy_from_bbox(b) for b in (ax1.bbox, ax2.bbox, title_bbox)]
+    for line in lines_row:
+        ax1.draw_artist(line)
+    for line in lines_col:
+        ax2.draw_artist(line)
+    fig.draw_artist(title)
+
+fig.canvas.mpl_connect('draw_event', on_draw)
+
+def set_tracked_ylim(ax, lo, hi, frozen=False):
+    """Apply running min/max as y-limits with a small margin, only if the view materially changes.
+
+    Once frozen the limits never shrink and only widen (with FROZEN_PAD headroom) when data leaves them.
+    Returns True when the limits moved (the blitted background is then stale).
+    """
+    if lo > hi:
+        return False  # no data yet
+    pad = (FROZEN_PAD if frozen else 0.05) * (hi - lo) or 1.0
+    cur_lo, cur_hi = ax.get_ylim()
+    outside = lo < cur_lo or hi > cur_hi
+    too_loose = not frozen and (cur_hi - cur_lo) > 1.5 * (hi - lo + 2 * pad)
+    if not (outside or too_loose):
+        return False
+    ax.set_ylim(lo - pad, hi + pad)
+    return True
+
+def window_min_max(buf, lengths):
+    """Exact min/max over the filled part of every ring row"""
+    filled = X_FULL[None, :] < lengths[:, None]
+    if not filled.any():
+        return float('inf'), float('-inf')
+    return int(buf[filled].min()), int(buf[filled].max())
+
+def unrolled(buf, counts):
+    """Rings reordered oldest-first with one gather (unfilled rows already start at 0)"""
+    start = np.where(counts >= HISTORY_LENGTH, counts % HISTORY_LENGTH, 0)
+    order = (start[:, None] + X_FULL[None, :]) % HISTORY_LENGTH
+    return np.take_along_axis(buf, order, axis=1)
+
+def update():
+    """Timer callback: read one frame and redraw"""
+    global frame_count, row_min, row_max, col_min, col_max
     
     # Read one complete frame (all rows and columns)
     for i in range(NUM_ROWS * NUM_COLS):
-        try:
-            line = ser.readline().decode('utf-8').strip()
-            
-            if not line or line.startswith("Row_index"):
-                continue
-                
-            # Parse CSV line: Row_index, Column_index, Raw_Cap_Row, Raw_Cap_Column
-            parts = line.split(',')
-            if len(parts) == 4:
-                row_idx = int(parts[0])
-                col_idx = int(parts[1])
-                raw_cap_row = int(parts[2])
-                raw_cap_col = int(parts[3])
-                
-                # Calculate linear index
-                idx = row_idx * NUM_COLS + col_idx
-                
-                # Append new data to history
-                row_history[idx].append(raw_cap_row)
-                col_history[idx].append(raw_cap_col)
-                
-        except Exception as e:
-            print(f"Error parsing line: {line} - {e}")
+        raw_line = reader.read_line()
+        
+        # Parse CSV line straight from bytes: Row_index, Column_index, Raw_Cap_Row, Raw_Cap_Column
+        # (empty reads and the repeated header come back as None)
+        vals = parse_frame(raw_line, 4, codes) if raw_line.strip() else None
+        if vals is None:
+            if raw_line.strip() and not raw_line.startswith(b"Row_index"):
+                print(f"Error parsing line: {raw_line.decode('utf-8', errors='ignore').strip()}")
             continue
+        row_idx, col_idx, raw_cap_row, raw_cap_col = vals.tolist()
+        
+        # Calculate linear index
+        idx = row_idx * NUM_COLS + col_idx
+        if not 0 <= idx < NUM_NODES:
+            print(f"Error parsing line: node R{row_idx}C{col_idx} out of range")
+            continue
+        
+        # Write new data into the node's ring
+        slot = sample_counts[idx] % HISTORY_LENGTH
+        row_buf[idx, slot] = raw_cap_row
+        col_buf[idx, slot] = raw_cap_col
+        sample_counts[idx] += 1
+        
+        row_min = min(row_min, raw_cap_row)
+        row_max = max(row_max, raw_cap_row)
+        col_min = min(col_min, raw_cap_col)
+        col_max = max(col_max, raw_cap_col)
     
     frame_count += 1
     
-    # Update all line plots
-    for i in range(NUM_ROWS * NUM_COLS):
-        if len(row_history[i]) > 0:
-            x_data = list(range(len(row_history[i])))
-            lines_row[i].set_data(x_data, list(row_history[i]))
-            lines_col[i].set_data(x_data, list(col_history[i]))
+    # Update only the lines whose node got new samples; x never changes, so only y is set
+    lengths = np.minimum(sample_counts, HISTORY_LENGTH)
+    changed = np.flatnonzero(sample_counts != drawn_counts)
+    if changed.size:
+        filled = X_FULL[None, :] < lengths[changed, None]
+        row_ordered = np.where(filled, unrolled(row_buf[changed], sample_counts[changed]), np.nan)
+        col_ordered = np.where(filled, unrolled(col_buf[changed], sample_counts[changed]), np.nan)
+        for j, i in enumerate(changed):
+            lines_row[i].set_ydata(row_ordered[j])
+            lines_col[i].set_ydata(col_ordered[j])
+        drawn_counts[changed] = sample_counts[changed]
+    
+    # While warming up, let the limits shrink again once old extremes have scrolled out of the window
+    warming_up = frame_count <= WARMUP_FRAMES
+    if warming_up and frame_count % RESCALE_FRAMES == 0:
+        row_min, row_max = window_min_max(row_buf, lengths)
+        col_min, col_max = window_min_max(col_buf, lengths)
     
-    # Auto-scale y-axis
-    ax1.relim()
-    ax1.autoscale_view(scalex=False, scaley=True)
-    ax2.relim()
-    ax2.autoscale_view(scalex=False, scaley=True)
+    # Scale y-axis from the tracked bounds
+    rescaled = set_tracked_ylim(ax1, row_min, row_max, frozen=not warming_up)
+    rescaled = set_tracked_ylim(ax2, col_min, col_max, frozen=not warming_up) or rescaled
     
-    # Update x-axis limits for scrolling effect
-    if frame_count > HISTORY_LENGTH:
-        ax1.set_xlim(frame_count - HISTORY_LENGTH, frame_count)
-        ax2.set_xlim(frame_count - HISTORY_LENGTH, frame_count)
+    if frame_count % RESCALE_FRAMES == 0:
+        title.set_text(f'Real-time Capacitance Monitoring - Frame {frame_count}')
     
-    # Update title with frame info
-    fig.suptitle(f'Real-time Capacitance Monitoring - Frame {frame_count}', fontsize=16)
+    # Axes and ticks are only redrawn (non-blitted) when the limits move
+    if rescaled or backgrounds is None:
+        fig.canvas.draw_idle()
+        return
     
-    return lines_row + lines_col
+    # Otherwise only the line artists (and, about once a second, the title) are blitted over the cache
+    for ax, bg, lines in ((ax1, backgrounds[0], lines_row), (ax2, backgrounds[1], lines_col)):
+        fig.canvas.restore_region(bg)
+        for line in lines:
+            ax.draw_artist(line)
+        fig.canvas.blit(ax.bbox)
+    if frame_count % RESCALE_FRAMES == 0:
+        fig.canvas.restore_region(backgrounds[2])
+        fig.draw_artist(title)
+        fig.canvas.blit(title_bbox)
 
-# Create animation
-ani = FuncAnimation(fig, update, interval=50, blit=False, cache_frame_data=False)
+# Drive updates from a plain canvas timer (no FuncAnimation frame bookkeeping)
+timer = fig.canvas.new_timer(interval=FRAME_INTERVAL_MS)
+timer.add_callback(update)
+timer.start()
 
 print("Starting real-time plot. Close the window to exit.")
 plt.show()
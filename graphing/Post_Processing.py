@@ -1,10 +1,13 @@
 import os
-import csv
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import numpy as np
+import matplotlib
+matplotlib.use("Agg")  # figures are only saved; also keeps the worker processes headless
 import matplotlib.pyplot as plt
 import pandas as pd
-from scipy import signal
 import matplotlib.lines as mlines  # ✅ for legend proxy
+from postproc_core import (load_repeat, common_time_base, trace_stats, pose_block_stats,
+                           block_extremum_indices, minmax_decimate)
 
 # --- Folders ---
 csvfolder = "single_hand_tests"
@@ -24,135 +27,96 @@ exclude_files = {
     # "20250911_node1_node5_v1.csv"
 }
 
-# --- Group files by condition ---
-conditions = {}
-for fname in os.listdir(csvfolder):
-    if not fname.endswith(".csv"):
-        continue
-    if fname in exclude_files:
-        print(f"⚠️ Skipping excluded file: {fname}")
-        continue
-    base = "_".join(fname.split("_")[:-1])
-    conditions.setdefault(base, []).append(fname)
-
-# --- Collect summary results ---
-summary_rows = []
-
-for cond, files in conditions.items():
+# --- Per-pose summary record (one row per pose, filled in place) ---
+summary_dtype = np.dtype([
+    ("Condition", object),
+    ("Pose", np.int32),
+    ("Abs Max ΔC (pF)", np.float64),
+    ("Std ΔC (pF)", np.float64),
+    ("SNR", np.float64),
+])
+
+# One plot figure per process, cleared and reused for each condition it handles
+_condition_fig = None
+
+def condition_axes():
+    """The reusable condition figure and its (cleared) axes"""
+    global _condition_fig
+    if _condition_fig is None:
+        _condition_fig, ax = plt.subplots(figsize=(12, 6))
+    else:
+        ax = _condition_fig.axes[0]
+        ax.cla()
+        # Undo the previous tight_layout so every plot is laid out from the same start
+        _condition_fig.subplots_adjust(**{k: plt.rcParams[f"figure.subplot.{k}"]
+                                          for k in ("left", "right", "bottom", "top")})
+    return _condition_fig, ax
+
+def process_condition(cond, files):
+    """Load, align, smooth and plot one condition; returns its per-pose summary records"""
     print(f"\nProcessing condition: {cond}")
-    all_repeats = []
-
-    # --- Load repeats ---
-    for f in sorted(files):
-        filepath = os.path.join(csvfolder, f)
-        times, vals = [], []
-
-        with open(filepath) as infile:
-            reader = csv.reader(infile)
-            next(reader, None)  # skip header
-            for row in reader:
-                try:
-                    t = float(row[0])
-                    v = float(row[channels_to_plot[0]])
-                    times.append(t)
-                    vals.append(v)
-                except:
-                    continue
-
-        if len(times) == 0:
-            continue
-
-        t0 = times[0]
-        times = np.array(times) - t0
-        vals = np.array(vals)
-        all_repeats.append((times, vals))
+    # --- Load repeats (files are full paths, already in name order) ---
+    # Read concurrently: pandas' C parser drops the GIL while it tokenizes, and map keeps the order
+    with ThreadPoolExecutor(max_workers=4) as loaders:
+        loaded = loaders.map(load_repeat, files, [channels_to_plot[0]] * len(files))
+        all_repeats = [rep for rep in loaded if rep is not None]
 
     if len(all_repeats) < 2:
         print("⚠️ Not enough repeats for condition")
-        continue
-
-    # --- Align x ranges across repeats ---
-    t_min = max(rep[0][0] for rep in all_repeats)
-    t_max = min(rep[0][-1] for rep in all_repeats)
-    n_points = min(len(rep[0]) for rep in all_repeats)
-    common_t = np.linspace(t_min, t_max, n_points)
-
-    # --- Interpolate & smooth each repeat ---
-    aligned_vals = []
-    for t, v in all_repeats:
-        v_interp = np.interp(common_t, t, v)
-        wl = min(21, len(v_interp) if len(v_interp) % 2 == 1 else len(v_interp) - 1)
-        wl = max(3, wl)
-        v_smooth = signal.savgol_filter(v_interp, wl, 1)
-        aligned_vals.append(v_smooth)
-    aligned_vals = np.vstack(aligned_vals)
-
-    # --- Truncate to 110 s max ---
-    mask = common_t <= 110
-    common_t = common_t[mask]
-    aligned_vals = aligned_vals[:, mask]
-
-    # --- Compute ΔC relative to baseline ---
-    dt = np.mean(np.diff(common_t))
+        return np.empty(0, dtype=summary_dtype)
+
+    # --- Align x ranges across repeats, truncated to 110 s max (common_t is increasing, so a prefix) ---
+    common_t, dt = common_time_base(all_repeats)
+    n_keep = np.searchsorted(common_t, 110, side="right")
+    # Too few samples for the 3-point smoothing window, or every row at one timestamp
+    if common_t.size < 3 or not dt > 0:
+        print("⚠️ Repeats too short for condition")
+        return np.empty(0, dtype=summary_dtype)
+
     block_samples = int(block_length / dt)
     if block_samples <= 0:
         block_samples = 1
 
-    # Break into blocks
-    blocks = []
-    for i in range(total_blocks):
-        start = i * block_samples
-        end = min((i + 1) * block_samples, aligned_vals.shape[1])
-        blocks.append(aligned_vals[:, start:end])
-
-    # Baseline (first rest block)
-    baseline = blocks[rest_baseline_block].mean()
+    # --- Interpolate & smooth each repeat, folding it straight into running stats ---
+    sum_trace, min_trace, max_trace, block_means, block_max, block_min = trace_stats(
+        all_repeats, common_t, n_keep, block_samples, total_blocks)
+    common_t = common_t[:n_keep]
+    if block_means.shape[1] == 0:  # no samples left for the baseline block
+        print("⚠️ Repeats too short for condition")
+        return np.empty(0, dtype=summary_dtype)
 
-    # ΔC
-    delta_vals = aligned_vals - baseline
-    mean_trace = delta_vals.mean(axis=0)
-    min_trace = delta_vals.min(axis=0)
-    max_trace = delta_vals.max(axis=0)
+    # --- Compute ΔC relative to baseline (first rest block) ---
+    baseline = block_means[:, rest_baseline_block].mean()
+    mean_trace = sum_trace / len(all_repeats) - baseline
+    min_trace -= baseline
+    max_trace -= baseline
 
     # --- Per-pose stats & absolute extrema markers ---
-    pose_markers = []  # store times of extrema (abs max)
-    for i in range(1, total_blocks, 2):  # skip rest blocks including 0
-        block = delta_vals[:, i * block_samples:(i + 1) * block_samples]
-        if block.size == 0:
-            continue
-
-        pose_num = (i + 1) // 2
-
-        # For each repeat, take the absolute extremum (max of |signal|)
-        extrema_per_repeat = []
-        for repeat in block:
-            max_val = repeat.max()
-            min_val = repeat.min()
-            extrema_val = max_val if abs(max_val) >= abs(min_val) else min_val
-            extrema_per_repeat.append(extrema_val)
-
-        extrema_per_repeat = np.array(extrema_per_repeat)
-        pose_val = extrema_per_repeat.mean()
-        pose_std = extrema_per_repeat.std()
-        pose_snr = abs(pose_val) / pose_std if pose_std > 0 else np.nan
+    pose_blocks, pose_vals, pose_stds = pose_block_stats(block_max - baseline, block_min - baseline)
 
-        # --- Marker placement (on block mean) ---
-        block_mean = block.mean(axis=0)
-        max_idx, min_idx = np.argmax(block_mean), np.argmin(block_mean)
-        if abs(block_mean[max_idx]) >= abs(block_mean[min_idx]):
-            extremum_idx = max_idx
-        else:
-            extremum_idx = min_idx
+    # --- Marker placement (absolute extremum of the mean trace in each pose block) ---
+    extremum_idx = block_extremum_indices(mean_trace, pose_blocks * block_samples, block_samples)
+    pose_markers = common_t[extremum_idx]  # store times of extrema (abs max)
 
-        extremum_time = common_t[i * block_samples + extremum_idx]
-        pose_markers.append(extremum_time)
-
-        summary_rows.append([cond, pose_num, pose_val, pose_std, pose_snr])
+    rows = np.empty(pose_blocks.size, dtype=summary_dtype)
+    rows["Condition"] = cond
+    rows["Pose"] = (pose_blocks + 1) // 2
+    rows["Abs Max ΔC (pF)"] = pose_vals
+    rows["Std ΔC (pF)"] = pose_stds
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rows["SNR"] = np.where(pose_stds > 0, np.abs(pose_vals) / pose_stds, np.nan)
 
     # --- Plot ---
-    fig, ax = plt.subplots(figsize=(12, 6))
-    ax.plot(common_t, mean_trace, color="blue", lw=1.5, label=f"{cond} mean")
-    ax.fill_between(common_t, min_trace, max_trace,
+    fig, ax = condition_axes()
+    # Drawn from the min and max of each output pixel column (12 in at 150 dpi); stats above use every sample
+    ax.plot(*minmax_decimate(common_t, mean_trace, 12 * 150), color="blue", lw=1.5, label=f"{cond} mean")
+
+    # Min–max band at ~2 points per output pixel (12 in at 150 dpi); each point is the
+    # envelope of its stride, so no extreme is dropped
+    stride = max(1, common_t.size // (12 * 150 * 2))
+    band_idx = np.arange(0, common_t.size, stride)
+    ax.fill_between(common_t[band_idx],
+                    np.minimum.reduceat(min_trace, band_idx), np.maximum.reduceat(max_trace, band_idx),
                     color="blue", alpha=0.2, label="min–max")
 
     # --- Orange vertical lines at extrema (full height) ---
@@ -181,63 +145,79 @@ for cond, files in conditions.items():
     handles.append(orange_proxy)
     ax.legend(handles=handles, loc="upper left")
 
-    plt.tight_layout()
+    fig.tight_layout()
     outfile = os.path.join(plotfolder, f"{cond}_processed.png")
-    plt.savefig(outfile, dpi=300)
-    plt.close()
-
-# --- Save summary table ---
-summary_df = pd.DataFrame(
-    summary_rows,
-    columns=["Condition", "Pose", "Abs Max ΔC (pF)", "Std ΔC (pF)", "SNR"]
-)
-summary_file = os.path.join(plotfolder, "summary.csv")
-summary_df.to_csv(summary_file, index=False)
-print(f"\n✅ Summary saved to {summary_file}")
-
-# --- Post-process: SNR summary ---
-rows = []
-for cond, group in summary_df.groupby("Condition"):
-    avg_snr = group["SNR"].mean()
-    lowest_snr = group.loc[group["SNR"].idxmin(), ["Pose", "SNR"]]
-    highest_std = group.loc[group["Std ΔC (pF)"].idxmax(), ["Pose", "Std ΔC (pF)"]]
-
-    rows.append({
-        "Condition": cond,
-        "Average SNR": avg_snr,
-        "Lowest SNR Pose": int(lowest_snr["Pose"]),
-        "Lowest SNR Value": lowest_snr["SNR"],
-        "Highest Std Pose": int(highest_std["Pose"]),
-        "Highest Std Value": highest_std["Std ΔC (pF)"]
+    fig.savefig(outfile, dpi=150, bbox_inches="tight")
+
+    return rows
+
+if __name__ == "__main__":
+    # --- Group files by condition ---
+    # Sorted once by name, so every condition's repeats (and the conditions) come out in order
+    conditions = {}
+    with os.scandir(csvfolder) as entries:
+        csv_files = sorted((e.name, e.path) for e in entries if e.name.endswith(".csv") and e.is_file())
+    for fname, path in csv_files:
+        if fname in exclude_files:
+            print(f"⚠️ Skipping excluded file: {fname}")
+            continue
+        base = fname.rpartition("_")[0]  # everything before the last "_" (the repeat tag)
+        conditions.setdefault(base, []).append(path)
+
+    # --- Collect summary results (conditions are independent, so each runs in its own process) ---
+    with ProcessPoolExecutor() as pool:
+        results = list(pool.map(process_condition, conditions.keys(), conditions.values()))
+    summary = np.concatenate(results) if results else np.empty(0, dtype=summary_dtype)
+
+    # --- Save summary table (columns and dtypes come straight from the record array) ---
+    summary_df = pd.DataFrame(summary)
+    summary_file = os.path.join(plotfolder, "summary.csv")
+    summary_df.to_csv(summary_file, index=False)
+    print(f"\n✅ Summary saved to {summary_file}")
+
+    # --- Post-process: SNR summary (one grouped pass per statistic) ---
+    by_cond = summary_df.groupby("Condition")
+    lowest_snr = summary_df.loc[by_cond["SNR"].idxmin()]
+    highest_std = summary_df.loc[by_cond["Std ΔC (pF)"].idxmax()]
+
+    snr_summary = pd.DataFrame({
+        "Condition": lowest_snr["Condition"].to_numpy(),
+        "Average SNR": by_cond["SNR"].mean().to_numpy(),
+        "Lowest SNR Pose": lowest_snr["Pose"].to_numpy(),
+        "Lowest SNR Value": lowest_snr["SNR"].to_numpy(),
+        "Highest Std Pose": highest_std["Pose"].to_numpy(),
+        "Highest Std Value": highest_std["Std ΔC (pF)"].to_numpy()
     })
 
-snr_summary = pd.DataFrame(rows)
-
-# --- Save & Show ---
-snr_summary_file = os.path.join(plotfolder, "snr_summary.csv")
-snr_summary.to_csv(snr_summary_file, index=False)
-
-print(f"\n✅ SNR summary saved to {snr_summary_file}")
-print("\n📊 SNR Summary Table:")
-print(snr_summary.to_string(index=False, float_format="%.2f"))
-
-# --- Save table as PNG ---
-fig, ax = plt.subplots(figsize=(10, len(snr_summary) * 0.6 + 1))
-ax.axis("off")
-
-table = ax.table(
-    cellText=snr_summary.round(2).values,
-    colLabels=snr_summary.columns,
-    cellLoc="center",
-    loc="center"
-)
-
-table.auto_set_font_size(False)
-table.set_fontsize(9)
-table.scale(1.1, 1.3)
-
-plt.tight_layout()
-plt.savefig(os.path.join(plotfolder, "snr_summary_table.png"), dpi=300)
-plt.close()
-
-print(f"📈 Table figure saved to {os.path.join(plotfolder, 'snr_summary_table.png')}")
+    # --- Save & Show ---
+    snr_summary_file = os.path.join(plotfolder, "snr_summary.csv")
+    snr_summary.to_csv(snr_summary_file, index=False)
+
+    print(f"\n✅ SNR summary saved to {snr_summary_file}")
+    print("\n📊 SNR Summary Table:")
+    print(snr_summary.to_string(index=False, float_format="%.2f"))
+
+    # --- Save table as PNG (not when no condition had a pose block) ---
+    if snr_summary.empty:
+        raise SystemExit("⚠️ No pose blocks to tabulate")
+    fig, ax = plt.subplots(figsize=(10, len(snr_summary) * 0.6 + 1))
+    ax.axis("off")
+
+    table = ax.table(
+        cellText=snr_summary.round(2).values,
+        colLabels=snr_summary.columns,
+        cellLoc="center",
+        loc="center"
+    )
+
+    table.auto_set_font_size(False)
+    table.set_fontsize(9)
+    table.scale(1.1, 1.3)
+
+    # Vector output: the table is text only, so SVG is small and skips rasterizing
+    fig.tight_layout()
+    table_file = os.path.join(plotfolder, "snr_summary_table.svg")
+    fig.savefig(table_file, bbox_inches="tight")
+    plt.close(fig)
+
+    print(f"📈 Table figure saved to {table_file}")
@@ -3,6 +3,7 @@ import matplotlib.pyplot as plt
 import numpy as np
 import os
 from glob import glob
+from postproc_core import load_csv
 
 def plot_node_comparison(folder=".", channels=None):
     # Collect all CSV files in folder
@@ -16,7 +17,7 @@ def plot_node_comparison(folder=".", channels=None):
     datasets = []
     for file in csv_files:
         try:
-            df = pd.read_csv(file)
+            df = load_csv(file)  # bad lines skipped, non-numeric cells -> NaN
             if "timestamp" not in df.columns:
                 print(f"Skipping {file}, no 'timestamp' column found.")
                 continue
@@ -66,17 +67,19 @@ def plot_node_comparison(folder=".", channels=None):
     plt.grid(True, alpha=0.3)
     plt.tight_layout()
     
+    # === Per-file channel statistics, one agg call per file (reused by the summary below) ===
+    stats = [df[[ch for ch in channels if ch in df.columns]].agg(["mean", "std", "min", "max"])
+             for _, df in datasets]
+
     # === Build statistics box text ===
-    stats_text = ""
-    for fname, df in datasets:
-        stats_text += f"{fname}:\n"
-        for ch in channels:
-            if ch in df.columns:
-                stats_text += (f"  {ch}: "
-                               f"{df[ch].mean():.2f}±{df[ch].std():.2f} pF\n")
-        stats_text += "\n"
+    blocks = []
+    for (fname, _), st in zip(datasets, stats):
+        lines = [f"{fname}:"]
+        lines += [f"  {ch}: {st.at['mean', ch]:.2f}±{st.at['std', ch]:.2f} pF" for ch in st.columns]
+        blocks.append("\n".join(lines))
+    stats_text = "\n\n".join(blocks)
     
-    plt.text(0.02, 0.98, stats_text.strip(), transform=plt.gca().transAxes,
+    plt.text(0.02, 0.98, stats_text, transform=plt.gca().transAxes,
              verticalalignment='top', horizontalalignment='left',
              bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8),
              fontsize=9, family="monospace")
@@ -90,21 +93,17 @@ def plot_node_comparison(folder=".", channels=None):
     
     # === Print full summary statistics ===
     print("=== Summary Statistics (Time-offset data) ===\n")
-    for fname, df in datasets:
+    for (fname, df), st in zip(datasets, stats):
         print(f"File: {fname}")
         print(f"  Data points: {len(df)}")
         print(f"  Duration: {df['timestamp'].max():.2f} seconds")
-        for ch in channels:
-            if ch in df.columns:
-                mean = df[ch].mean()
-                std = df[ch].std()
-                min_val = df[ch].min()
-                max_val = df[ch].max()
-                print(f"  {ch}:")
-                print(f"    Mean: {mean:.2f} pF")
-                print(f"    Std:  {std:.2f} pF")
-                print(f"    Min:  {min_val:.2f} pF")
-                print(f"    Max:  {max_val:.2f} pF")
+        for ch in st.columns:
+            mean, std, min_val, max_val = st[ch]
+            print(f"  {ch}:")
+            print(f"    Mean: {mean:.2f} pF")
+            print(f"    Std:  {std:.2f} pF")
+            print(f"    Min:  {min_val:.2f} pF")
+            print(f"    Max:  {max_val:.2f} pF")
         print("-" * 40)
 
 if __name__ == "__main__":
@@ -1,39 +1,19 @@
-import csv
-from collections import defaultdict
-import math
-import statistics
+import numpy as np
+import pandas as pd
 import matplotlib.pyplot as plt
 
-# Read the cleaned CSV
-times = []
-channels = [[] for _ in range(4)]
-sensing_units = [[] for _ in range(4)]
+# Read the cleaned CSV (short rows and blank/unparseable cells become NaN). A callable usecols
+# keeps every header column and drops the extra fields of over-long rows
 csvfilename = "CLEAN2.csv"
+cols = pd.read_csv(csvfilename, usecols=lambda name: True, memory_map=True).iloc[:, :5]
+cols = cols.apply(pd.to_numeric, errors='coerce').to_numpy()
+data = np.full((len(cols), 5), np.nan)
+data[:, :cols.shape[1]] = cols  # channels a narrower file does not have stay all NaN
 
-with open(csvfilename, 'r') as infile:
-    csvreader = csv.reader(infile)
-    next(csvreader)  # skip header
-    for row in csvreader:
-        try:
-            times.append(float(row[0]))
-        except (ValueError, IndexError):
-            times.append(float('nan'))
-        for ch in range(4):
-            if ch + 1 < len(row):
-                val = row[ch + 1]
-                channels[ch].append(float(val) if val != '' else float('nan'))
-            else:
-                channels[ch].append(float('nan'))
-
-for i in range(len(times)):
-    ch0 = channels[0][i]
-    ch1 = channels[1][i]
-    ch2 = channels[2][i]
-    ch3 = channels[3][i]
-    sensing_units[0].append(ch0 * ch2)
-    sensing_units[1].append(ch0 * ch3)
-    sensing_units[2].append(ch1 * ch2)
-    sensing_units[3].append(ch1 * ch3)
+times = data[:, 0]
+# Units are the 2x2 outer product of rows (ch0, ch1) and columns (ch2, ch3), all in one broadcast
+# multiply; column u = 2*row + col, i.e. ch0*ch2, ch0*ch3, ch1*ch2, ch1*ch3
+sensing_units = (data[:, 1:3, None] * data[:, None, 3:5]).reshape(-1, 4)
 
 # --- [2] --- [3] ---
 # --- [0] --- [1] ---
@@ -41,7 +21,7 @@ for i in range(len(times)):
 # Plot
 plt.figure(figsize=(10, 6))
 for ch in range(4):
-    plt.plot(times, sensing_units[ch], label=f'Unit{ch}_Avg')
+    plt.plot(times, sensing_units[:, ch], label=f'Unit{ch}_Avg')
 plt.xlabel('Time (s)')
 plt.ylabel('Filtered Average (pF)')
 plt.title('Filtered Units Averages Over Time')
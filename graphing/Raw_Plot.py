@@ -1,5 +1,5 @@
-import csv
 import os
+import pandas as pd
 import matplotlib.pyplot as plt
 from cmcrameri import cm
 import numpy as np
@@ -23,44 +23,35 @@ for csvfilename in data:
     # Create figure
     plt.figure(figsize=(12, 6))
     
-    # Load CSV header to detect channels
-    with open(file_path, "r") as infile:
-        csvreader = csv.reader(infile)
-        header = next(csvreader)
-        num_columns = len(header)
-        
-        times = []
-        channel_data = {i: [] for i in range(1, num_columns)}  # skip timestamp (col 0)
-        
-        for row in csvreader:
-            if len(row) != num_columns:
-                continue  # skip malformed lines
-            try:
-                times.append(float(row[0]))
-                for i in range(1, num_columns):
-                    channel_data[i].append(float(row[i]))
-            except ValueError:
-                continue
-    
-    if not times:
-        print(f"⚠️ No valid data in {csvfilename}")
-        continue
-    
-    # Normalize time
-    t0 = times[0]
-    times = [t - t0 for t in times]
+    # Parse in pandas' C reader; lines with the wrong number of fields are skipped
+    df = pd.read_csv(file_path, on_bad_lines="skip")
+    header = df.columns.tolist()
+    num_columns = len(header)
     
     # Determine which channels to plot
     if channels_to_plot is None:
         # Plot all channels
-        selected_channels = list(channel_data.keys())
+        selected_channels = list(range(1, num_columns))
     else:
         # Plot only specified channels
-        selected_channels = [ch for ch in channels_to_plot if ch in channel_data]
+        selected_channels = [ch for ch in channels_to_plot if 1 <= ch < num_columns]
         if not selected_channels:
             print(f"⚠️ No valid channels selected for {csvfilename}")
             continue
     
+    # Only time + the plotted channels are converted, as one (rows, 1 + channels) array;
+    # rows with an unparseable cell in those columns are dropped (the mask gives a writable copy)
+    values = df.iloc[:, [0] + selected_channels].apply(pd.to_numeric, errors="coerce").to_numpy()
+    values = values[~np.isnan(values).any(axis=1)]
+    
+    if len(values) == 0:
+        print(f"⚠️ No valid data in {csvfilename}")
+        continue
+    
+    # Normalize time in place on the time column (no extra copy)
+    values[:, 0] -= values[0, 0]
+    times = values[:, 0]
+    
     # Generate colors for selected channels
     num_channels = len(selected_channels)
     colors = cm.batlow(np.linspace(0, 1, num_channels))
@@ -69,7 +60,7 @@ for csvfilename in data:
     for idx, ch in enumerate(selected_channels):
         plt.plot(
             times,
-            channel_data[ch],
+            values[:, idx + 1],  # column view, no copy
             label=header[ch],   # use header names as labels
             linewidth=1.2,
             color=colors[idx]
@@ -87,7 +78,7 @@ for csvfilename in data:
     # if not os.path.exists(plotfolder):
     #     os.makedirs(plotfolder)
     # outfile = os.path.join(plotfolder, f"{os.path.splitext(csvfilename)[0]}.png")
-    # plt.savefig(outfile, dpi=300)
+    # plt.savefig(outfile, dpi=150, pil_kwargs={"compress_level": 1})  # 300 dpi for publication; fast zlib level
     # plt.close()
     # print(f"✅ Saved plot → {outfile}")
     
@@ -1,11 +1,11 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
 import pandas as pd
 from matplotlib.path import Path
 from matplotlib.patches import PathPatch
 import os
 import matplotlib.image as mpimg
+from scipy.ndimage import gaussian_filter1d
 
 
 SIMULATE_SERIAL = True   # <<< set to False when using real hardware
@@ -20,7 +20,6 @@ GRID_RES = 300
 # =========================== NEW: SERIAL SETUP ===========================
 import serial
 import time
-from collections import deque
 
 SERIAL_PORT = "/dev/tty.usbserial-2110"
 BAUD_RATE = 115200
@@ -32,8 +31,11 @@ if not SIMULATE_SERIAL:
 else:
     ser = None  # no real port
 
-timestamps = deque(maxlen=MAX_FRAMES)
-raw_frames = deque(maxlen=MAX_FRAMES)
+# Newest MAX_FRAMES frames in fixed numpy rings; frame_count is the total received,
+# so the newest frame is at (frame_count - 1) % MAX_FRAMES
+timestamps = np.zeros(MAX_FRAMES)
+raw_frames = np.zeros((MAX_FRAMES, 8), dtype=np.float32)  # float32 like the whole field pipeline below
+frame_count = 0
 
 start_time = time.time()
 
@@ -69,14 +71,15 @@ def read_serial_frame():
 
 def serial_data_generator():
     """Continuously read serial and yield newest frame index for animation."""
-    frame_idx = 0
+    global frame_count
     while True:
         frame = read_serial_frame()
         if frame is not None:
-            raw_frames.append(frame)
-            timestamps.append(time.time() - start_time)
-            yield frame_idx
-            frame_idx += 1
+            slot = frame_count % MAX_FRAMES
+            raw_frames[slot] = frame
+            timestamps[slot] = time.time() - start_time
+            frame_count += 1
+            yield frame_count - 1
 
 
 # ====================== LOAD CSV (DISABLED FOR LIVE) ===============================
@@ -96,7 +99,8 @@ def compute_intersections(frame_8ch):
     inter_matrix = np.outer(rows, cols)
     return inter_matrix.ravel()
 
-# A_data = np.apply_along_axis(compute_intersections, 1, raw_data)
+# Whole recording at once: (frames, 4) rows x (frames, 4) cols -> (frames, 16), no per-frame callback
+# A_data = (raw_data[:, 0:4, None] * raw_data[:, None, 4:8]).reshape(-1, 16)
 
 # ===================== GLOVE GEOMETRY =========================
 
@@ -206,12 +210,17 @@ print("================================================\n")
 
 
 # ================= HARD-CODED MIN/MAX FOR NORMALIZATION =================
-A_min = np.zeros(16)
-A_max = np.ones(16) * 250000  # adjust as needed
+A_min = np.zeros(16, dtype=np.float32)
+A_max = np.full(16, 250000, dtype=np.float32)  # adjust as needed
 A_range = A_max - A_min
 
-def per_node_intensity(A_flat):
-    return np.clip((A_flat - A_min) / A_range, 0.0, 1.0)
+# The 16 normalized intensities, rewritten in place every frame
+I16_buf = np.empty(16, dtype=np.float32)
+
+def per_node_intensity(A_flat, out=I16_buf):
+    np.subtract(A_flat, A_min, out=out)
+    np.divide(out, A_range, out=out)
+    return np.clip(out, 0.0, 1.0, out=out)
 
 
 # ==================== HEATMAP FUNCTIONS =========================
@@ -224,54 +233,61 @@ SIGMA_X = SPREAD_FACTOR * span_x
 SIGMA_Y = SPREAD_FACTOR * span_y
 HEAT_BLUR = 1
 
-def gaussian1d(sigma_px, radius=None):
-    if sigma_px <= 0:
-        return np.array([1.0])
-    if radius is None:
-        radius = max(1, int(3 * sigma_px))
-    xs = np.arange(-radius, radius + 1)
-    k = np.exp(-(xs**2) / (2 * sigma_px**2))
-    return k / k.sum()
-
 def gaussian_blur(arr, sigma_px=3):
     if sigma_px <= 0:
         return arr
-    k = gaussian1d(sigma_px)
-    arr = np.apply_along_axis(lambda m: np.convolve(m, k, mode='same'),
-                              axis=1, arr=arr)
-    arr = np.apply_along_axis(lambda m: np.convolve(m, k, mode='same'),
-                              axis=0, arr=arr)
+    # Separable blur in scipy's C filter; zero padding and a 3-sigma radius as before
+    radius = max(1, int(3 * sigma_px))
+    arr = gaussian_filter1d(arr, sigma_px, axis=1, mode='constant', radius=radius)
+    arr = gaussian_filter1d(arr, sigma_px, axis=0, mode='constant', radius=radius)
     return arr
 
-def intensity_to_rgb(I):
-    R = np.ones_like(I)
-    G = 1.0 - 0.7 * I
-    B = 1.0 - 0.7 * I
-    return np.stack([R, G, B], axis=-1)
+# The heat map's uint8 RGB frame, refilled in place: red is always full, green and blue
+# fade together from 255 at zero intensity to 76 at full
+rgb_buf = np.empty((GRID_RES, GRID_RES, 3), dtype=np.uint8)
+rgb_buf[..., 0] = 255
+shade_buf = np.empty((GRID_RES, GRID_RES), dtype=np.float32)
+
+def intensity_to_rgb(I, out=rgb_buf):
+    # 255 * (1 - 0.7 * I), truncated to uint8 the same way matplotlib quantizes float RGB
+    np.multiply(I, -178.5, out=shade_buf)
+    np.add(shade_buf, 255, out=shade_buf)
+    np.copyto(out[..., 1], shade_buf, casting='unsafe')
+    out[..., 2] = out[..., 1]
+    return out
 
 # ===================== HEATMAP GRID ===========================
 
-x_grid = np.linspace(-1, 1, GRID_RES)
-y_grid = np.linspace(-1, 1, GRID_RES)
-X, Y = np.meshgrid(x_grid, y_grid)
+# float32 throughout: the field ends up as 8-bit color, so float64 only costs bandwidth
+x_grid = np.linspace(-1, 1, GRID_RES, dtype=np.float32)
+y_grid = np.linspace(-1, 1, GRID_RES, dtype=np.float32)
+
+# Gaussian exponent scales, hoisted out of the per-frame field calc
+INV_2SX2 = np.float32(1.0 / (2 * SIGMA_X**2))
+INV_2SY2 = np.float32(1.0 / (2 * SIGMA_Y**2))
+
+# The mockup nodes never move, so each one's Gaussian is precomputed once as a float32
+# stencil (~5.8 MB for 16). Each is separable: the outer product of a y and an x profile
+mockup_x = x_coords[mockup_indices].astype(np.float32)
+mockup_y = y_coords[mockup_indices].astype(np.float32)
+stencils = np.empty((n_channels, GRID_RES, GRID_RES), dtype=np.float32)
+for k, (cx, cy) in enumerate(zip(mockup_x, mockup_y)):
+    np.multiply.outer(np.exp(-(y_grid - cy)**2 * INV_2SY2), np.exp(-(x_grid - cx)**2 * INV_2SX2),
+                      out=stencils[k])  # rows are y
+stencils_flat = stencils.reshape(n_channels, -1)
+
+# Field buffer every frame is written into
+F_buf = np.zeros((GRID_RES, GRID_RES), dtype=np.float32)
 
 # ===================== FIELD CALC ====================
 
 def field_from_matrix(A_flat):
-    F = np.zeros_like(X)
-
     mockup_intensities = per_node_intensity(A_flat)
-    intensities_all = np.zeros(num_nodes)
-    intensities_all[mockup_indices] = mockup_intensities
 
-    for (cx, cy), I in zip(sensor_coords, intensities_all):
-        if I <= 0:
-            continue
-        g = np.exp(-(((X - cx)**2) / (2 * SIGMA_X**2)
-                     + ((Y - cy)**2) / (2 * SIGMA_Y**2)))
-        F += I * g
+    # F = sum_k I_k * stencil_k as one vector-matrix product, no exp per frame
+    np.matmul(mockup_intensities, stencils_flat, out=F_buf.reshape(-1))
 
-    F = gaussian_blur(np.clip(F, 0, 1), sigma_px=HEAT_BLUR)
+    F = gaussian_blur(np.clip(F_buf, 0, 1, out=F_buf), sigma_px=HEAT_BLUR)
 
     return F
 
@@ -283,8 +299,8 @@ ax.set_xlim(-1, 1)
 ax.set_ylim(-1, 1)
 ax.axis('off')
 
-hand_img = mpimg.imread(HAND_IMG_FILE)
-hand_img = np.flipud(hand_img)
+# Flipped once into a contiguous array, so imshow does not copy the strided view
+hand_img = np.ascontiguousarray(np.flipud(mpimg.imread(HAND_IMG_FILE)))
 ax.imshow(
     hand_img,
     extent=[-1, 1, -1, 1],
@@ -293,7 +309,7 @@ ax.imshow(
 )
 
 img = ax.imshow(
-    np.ones((GRID_RES, GRID_RES, 3)),
+    np.full((GRID_RES, GRID_RES, 3), 255, dtype=np.uint8),
     extent=[-1, 1, -1, 1],
     origin='lower',
     interpolation='nearest',
@@ -309,7 +325,7 @@ for idx in mockup_indices:
 node_sizes = np.full(num_nodes, 10)
 node_sizes[mockup_indices] = 10
 
-ax.scatter(x_coords, y_coords, s=node_sizes, c=node_colors, alpha=0.85, zorder=2)
+nodes = ax.scatter(x_coords, y_coords, s=node_sizes, c=node_colors, alpha=0.85, zorder=2, animated=True)
 
 labels = []
 # Labels disabled to reduce clutter — keep empty list for update return
@@ -318,18 +334,37 @@ timestamp_text = ax.text(
     0, -1.05,
     "t = 0.000 s",
     ha='center', va='top',
-    fontsize=8
+    fontsize=8,
+    animated=True
 )
 
 # ===================== ANIMATION UPDATE ========================
 
+FRAME_INTERVAL_MS = 16  # about one display refresh
+
+# The hand image and axes are static: they are drawn only on full draws and cached, and
+# each frame blits the heat map, the nodes on top of it, and the timestamp (which sits
+# below the axes, so the cache covers the whole figure rather than ax.bbox)
+background = None
+animated_artists = (img, nodes, timestamp_text)  # in zorder
+
+def on_draw(event):
+    """After every full draw (first show, resize): recapture the background and paint the animated artists"""
+    global background
+    background = fig.canvas.copy_from_bbox(fig.bbox)
+    for artist in animated_artists:
+        ax.draw_artist(artist)
+
+fig.canvas.mpl_connect('draw_event', on_draw)
+
 def update(i):
     # A_flat = A_data[i]   # (CSV MODE) — NOT USED NOW
 
-    if len(raw_frames) == 0:
+    if frame_count == 0:
         return [img] + labels + [timestamp_text]
 
-    frame_8ch = raw_frames[-1]
+    newest = (frame_count - 1) % MAX_FRAMES
+    frame_8ch = raw_frames[newest]  # row view, no list -> array conversion
     A_flat = compute_intersections(frame_8ch)
 
     F = field_from_matrix(A_flat)
@@ -337,18 +372,27 @@ def update(i):
 
     # labels are disabled; skip per-node text updates
 
-    timestamp_text.set_text(f"t = {timestamps[-1]:.3f}s")
+    timestamp_text.set_text(f"t = {timestamps[newest]:.3f}s")
 
     return [img] + labels + [timestamp_text]
 
 
-ani = FuncAnimation(
-    fig,
-    update,
-    frames=serial_data_generator(),
-    interval=1,
-    blit=False
-)
+frames = serial_data_generator()
+
+def on_timer():
+    """Timer callback: take the next frame and blit it over the cached background"""
+    update(next(frames))
+    if background is None:
+        fig.canvas.draw_idle()
+        return
+    fig.canvas.restore_region(background)
+    for artist in animated_artists:
+        ax.draw_artist(artist)
+    fig.canvas.blit(fig.bbox)
+
+timer = fig.canvas.new_timer(interval=FRAME_INTERVAL_MS)
+timer.add_callback(on_timer)
+timer.start()
 
 plt.tight_layout()
 plt.show()
\ No newline at end of file
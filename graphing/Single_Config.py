@@ -2,28 +2,26 @@ import serial
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Button
 from collections import deque
-import math
 import csv
 import time
 import threading
 import tkinter as tk
 from tkinter import filedialog
+import numpy as np
+from mux_core import SerialLineReader, parse_frame, ingest_frame, capacitance_constant
 
-# FDC2214 constants
-ref_clock = 40e6  # Hz
-scale_factor = ref_clock / (2 ** 28)
+# FDC2214 constants (40 MHz reference, 28-bit codes; see mux_core)
 inductance = 18e-6  # H
 channel_num = 2
- 
-def raw_to_capacitance(raw):
-    freq = raw * scale_factor
-    if freq <= 0:
-        return 0.0
-    cap_F = 1.0 / ((2 * math.pi * freq) ** 2 * inductance)
-    return cap_F * 1e12  # picofarads
+K_PF = capacitance_constant(inductance)  # C[pF] = K_PF / raw**2, folded once at import
+
+# Reused per-frame buffers: parsed codes (+1 spare slot to reject extras) and (elapsed, caps...) row
+codes = np.empty(channel_num + 1, dtype=np.int64)
+frame_row = np.empty(channel_num + 1)
 
 # Serial setup (adjust port as needed)
 ser = serial.Serial("COM13", 115200, timeout=1)
+reader = SerialLineReader(ser)  # drains in_waiting in bulk instead of readline()'s per-byte reads
 
 buffer_len = 100
 start_time = time.time()
@@ -135,31 +133,27 @@ def serial_worker():
     
     while True:
         try:
-            raw_line = ser.readline().decode(errors="ignore").strip()
+            raw_line = reader.read_line().strip()
             if not raw_line:
                 continue
             
             # Print raw line for debugging
             # print(f"[DEBUG] Raw line: {raw_line}")
             
-            # Remove trailing comma and split
-            parts = [p.strip() for p in raw_line.rstrip(',').split(",")]
-            
-            # Filter out empty strings
-            parts = [p for p in parts if p]
-            
-            if len(parts) != channel_num:
-                print(f"[WARNING] Expected {channel_num} values, got {len(parts)}: {parts}")
+            # Parse straight from bytes (spaces and a trailing comma are allowed)
+            raw_vals = parse_frame(raw_line, channel_num, codes)
+            if raw_vals is None:
+                print(f"[WARNING] Expected {channel_num} values: {raw_line.decode(errors='ignore')}")
                 continue
 
-            raw_vals = [int(p) for p in parts]
-            caps = [raw_to_capacitance(r) for r in raw_vals]
+            # Update buffers; the whole frame is converted in one call (njit when numba is available)
+            now = time.time()
+            elapsed = now - start_time
+            ingest_frame(raw_vals, frame_row, elapsed, K_PF, 0.0)
+            caps = frame_row[1:].tolist()
             
             # print(f"[DEBUG] Capacitances: {[f'{c:.2f}' for c in caps]} pF")
 
-            # Update buffers
-            now = time.time()
-            elapsed = now - start_time
             time_buffer.append(elapsed)
             
             for i in range(channel_num):
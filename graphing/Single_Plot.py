@@ -1,13 +1,18 @@
-import csv
 import os
-import math
-import statistics
 import numpy as np
+import pandas as pd
 import matplotlib.pyplot as plt
-from collections import defaultdict
 from cmcrameri import cm
 import re 
 
+# pyarrow is optional: with it pandas parses in its multithreaded Arrow reader (much faster
+# on long logs), without it in the C parser
+try:
+    import pyarrow  # noqa: F401
+    csv_engine = "pyarrow"
+except ImportError:
+    csv_engine = "c"
+
 
 csvfolder = "data"
 plotfolder = "Array_Plots"
@@ -45,46 +50,34 @@ for csvfilename in pose_files:
     # Create a new figure for this file
     plt.figure(figsize=(10, 6))
 
+    # Parse once; lines with the wrong number of fields are skipped, bad cells become NaN
+    df = pd.read_csv(file_path, engine=csv_engine, on_bad_lines="skip").apply(pd.to_numeric, errors="coerce")
+
 
     # Process and plot each channel
     for channel_num in channels_to_plot:
         
-        binned_data = defaultdict(list)
-
-        with open(file_path, "r") as infile:
-            csvreader = csv.reader(infile)
-            next(csvreader, None)  # skip header
-            for row in csvreader:
-                try:
-                    time = float(row[0])
-                    value = float(row[channel_num])  # use the extracted channel index
-                    time_bin = math.floor(time)
-                    binned_data[time_bin].append(value)
-                except (ValueError, IndexError):
-                    continue
-
-        if not binned_data:
+        if channel_num < df.shape[1]:
+            # time + the extracted channel index, rows with a bad cell in either dropped
+            pair = df.iloc[:, [0, channel_num]].dropna().to_numpy()
+        else:
+            pair = np.empty((0, 2))
+
+        if len(pair) == 0:
             print(f"⚠️ No valid data in {csvfilename} for CH{channel_num}")
             continue
 
-        times = sorted(binned_data.keys())
-        ch_avg = [statistics.mean(binned_data[t]) for t in times]
+        # Average per whole second in two bincount passes; bins are counted from the first second
+        time_bins = np.floor(pair[:, 0]).astype(np.int64)
+        time_bins -= time_bins.min()
+        counts = np.bincount(time_bins)
+        sums = np.bincount(time_bins, weights=pair[:, 1])
 
-        # Slice to first 130 seconds
-        t0 = times[0]
-        start = t0
-        end = start + 600
+        # Slice to the first 600 seconds, keeping only seconds that have samples
+        bin_times = np.flatnonzero(counts[:600])
+        sliced_times = bin_times.tolist()
+        sliced_avg = sums[bin_times] / counts[bin_times]
 
-        sliced_times, sliced_avg = [], []
-        for t, v in zip(times, ch_avg):
-            if start <= t < end:
-                sliced_times.append(t - start)
-                sliced_avg.append(v)
-
-        if not sliced_times:
-            print(f"⚠️ Not enough data in {csvfilename} for CH{channel_num}")
-            continue
-        
         if sliced_times_ref is None:
             sliced_times_ref = sliced_times
             npoints = len(sliced_times_ref)
@@ -1,60 +1,68 @@
 import serial
-import csv
 import time
 from datetime import datetime
-import math
+import numpy as np
+from mux_core import CsvLogger, parse_frame, ingest_frame, capacitance_constant
 
-# FDC2214 constants
-ref_clock = 40e6  # Hz
-scale_factor = ref_clock / (2 ** 28)  # ~0.149 Hz per LSB
+# FDC2214 constants (40 MHz reference, 28-bit codes; see mux_core)
 inductance = 180e-9  # H
+channel_num = 4
+K_PF = capacitance_constant(inductance)  # C[pF] = K_PF / raw**2, folded once at import
 
-def raw_to_capacitance(raw):
-    freq = raw * scale_factor
-    if freq <= 0:
-        return 0
-    cap_F = 1.0 / ((2 * math.pi * freq) ** 2 * inductance)
-    return cap_F * 1e12  # convert to picofarads
+# Reused per-frame buffers: parsed codes (+1 spare slot to reject extras) and (elapsed, caps...) row
+codes = np.empty(channel_num + 1, dtype=np.int64)
+frame_row = np.empty(channel_num + 1)
 
-# CSV setup
+# Serial setup (opened first, so a missing device never leaves an empty log behind)
+ser = serial.Serial('/dev/tty.usbmodem2101', 115200)  # Update COM port if needed
+
+# CSV setup: rows are queued to CsvLogger's writer thread, which writes them in batches
+# through a large file buffer instead of flushing every sample
 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 csv_filename = f"fdc2214_data_log_{timestamp}.csv"
-csv_file = open(csv_filename, 'w', newline='')
-csv_writer = csv.writer(csv_file)
-csv_writer.writerow(['Time_s', 'Capacitance_CH0_pF', 'Capacitance_CH1_pF', 'Capacitance_CH2_pF', 'Capacitance_CH3_pF'])
+logger = CsvLogger(['Time_s', 'Capacitance_CH0_pF', 'Capacitance_CH1_pF', 'Capacitance_CH2_pF', 'Capacitance_CH3_pF'],
+                   batch_rows=100)
+if not logger.start(csv_filename):
+    ser.close()
+    raise SystemExit(1)
 
 print(f"Data will be saved to: {csv_filename}")
 print("Press Ctrl+C to stop data collection")
 
-# Serial setup
-ser = serial.Serial('/dev/tty.usbmodem2101', 115200)  # Update COM port if needed
-
 # Timing
 start_time = time.time()
+sample_counter = 0
 
 # Data collection loop
 try:
     while True:
-        line = ser.readline().decode().strip()
+        raw_line = ser.readline().strip()
         try:
-            raw_values = list(map(int, line.split(",")))
-            if len(raw_values) == 4:
-                cap_values = [raw_to_capacitance(raw) for raw in raw_values]
+            # Parse straight from bytes; malformed or wrong-length frames come back as None
+            raw_values = parse_frame(raw_line, channel_num, codes)
+            if raw_values is None:
+                print(f"Error parsing data: {raw_line.decode(errors='ignore')}")
+            else:
+                # The whole frame is converted in one call (njit when numba is available)
                 current_time = time.time() - start_time
+                ingest_frame(raw_values, frame_row, current_time, K_PF, 0.0)
 
-                # Save to CSV
-                csv_writer.writerow([current_time] + cap_values)
-                csv_file.flush()  # Ensure data is written immediately
+                # Save to CSV (queued; the logger thread writes it in a batch)
+                logger.write(frame_row.tolist())
                 
-                # Print status every 100 samples
-                if int(current_time * 10) % 100 == 0:  # Every 10 seconds
-                    print(f"Time: {current_time:.1f}s, CH0: {cap_values[0]:.2f} pF")
+                # Print status every 1000 samples (a time-window gate fired on every sample inside it)
+                sample_counter += 1
+                if sample_counter % 1000 == 0:
+                    print(f"Time: {current_time:.1f}s, CH0: {frame_row[1]:.2f} pF")
                     
         except Exception as e:
             print(f"Error parsing data: {e}")
             pass
             
 except KeyboardInterrupt:
-    print(f"\nData collection stopped. Data saved to: {csv_filename}")
-    csv_file.close()
-    ser.close() 
\ No newline at end of file
+    print("\nData collection stopped.")
+finally:
+    # Any way out (Ctrl+C, device unplugged): write whatever is still queued, then close the file
+    logger.stop()
+    ser.close()
+    print(f"Data saved to: {csv_filename}") 
\ No newline at end of file
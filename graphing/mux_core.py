@@ -0,0 +1,630 @@
+"""
+mux_core.py - shared pieces of the live MUX capacitance plotters
+Used by MUX_4_1_Plotting.py, MUX_Plotting_Mac.py, MUX_Differential_Plotting.py,
+(serial reading only) MUX_Node_Plotting.py, 4x4_16_Plots_Diff.py and
+Differential_Config.py, (reading, frame conversion) Single_Config.py, and
+(reading, frame conversion, logging, live plot) Single_Config_fixed.py and
+(reading, frame conversion, logging) data_logger.py
+
+run() reads the serial port and writes the CSV log in a child process and hands
+converted frames to the plotting process through a shared-memory ring.
+"""
+
+import matplotlib.pyplot as plt
+from matplotlib.widgets import Button
+from matplotlib.ticker import FuncFormatter
+import numpy as np
+import serial
+import csv
+import time
+import threading
+import queue
+import multiprocessing as mp
+from multiprocessing.shared_memory import SharedMemory
+import os
+import functools
+from datetime import datetime
+
+# Numba is optional: without it the frame kernel below runs as plain NumPy
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# -------------------------------
+# FDC2214 constants
+# -------------------------------
+REF_CLOCK = 40e6  # Hz
+SCALE_FACTOR = REF_CLOCK / (2 ** 28)
+INDUCTANCE = 18e-6  # H
+
+@functools.lru_cache(maxsize=None)
+def capacitance_constant(inductance=INDUCTANCE):
+    """K such that C [pF] = K / raw**2 for a raw FDC2214 code (computed once per inductance)"""
+    return 1e12 / ((2 * np.pi * SCALE_FACTOR) ** 2 * inductance)
+
+def raw_to_capacitance(raw, inductance=INDUCTANCE, c_fixed=0.0):
+    """Convert raw FDC2214 codes (scalar or whole frame) to capacitance in pF.
+
+    c_fixed (F) is the parallel capacitance subtracted for differential setups.
+    Non-positive codes map to 0.
+    """
+    r = np.asarray(raw, dtype=np.float64)
+    valid = r > 0
+    safe_r = np.where(valid, r, 1.0)
+    return np.where(valid, capacitance_constant(inductance) / (safe_r * safe_r) - c_fixed * 1e12, 0.0)  # pF
+
+if njit is not None:
+    @njit(cache=True, fastmath=True, nogil=True)
+    def ingest_frame(raw, row, elapsed, k, c_fixed_pf):
+        """Write (elapsed, cap_0 .. cap_n-1) for one frame of raw codes into row, in pF"""
+        row[0] = elapsed
+        for i in range(raw.shape[0]):
+            r = float(raw[i])
+            row[i + 1] = k / (r * r) - c_fixed_pf if r > 0 else 0.0
+else:
+    def ingest_frame(raw, row, elapsed, k, c_fixed_pf):
+        """Write (elapsed, cap_0 .. cap_n-1) for one frame of raw codes into row, in pF"""
+        row[0] = elapsed
+        r = raw.astype(np.float64)
+        valid = r > 0
+        np.divide(k, r * r, out=row[1:], where=valid)
+        row[1:] -= c_fixed_pf
+        row[1:][~valid] = 0.0
+
+if njit is not None:
+    @njit(cache=True, nogil=True)
+    def parse_codes(buf, out):
+        """Parse comma-separated decimal integers from a uint8 buffer into out.
+
+        Spaces, tabs, CR and LF are allowed around a number (not inside it) and a trailing comma
+        is allowed, so lines straight from readline() parse without decode()/strip().
+        Returns the number of values, or -1 if the line is malformed or has more than out.size values.
+        """
+        n = 0
+        val = 0
+        digits = 0
+        neg = False
+        ended = False  # whitespace after the number's digits: only a comma may follow
+        for c in buf:
+            if 48 <= c <= 57:  # '0'-'9'
+                if ended:
+                    return -1
+                val = val * 10 + (c - 48)
+                digits += 1
+            elif c == 44:  # ','
+                if digits == 0 or n == out.size:
+                    return -1
+                out[n] = -val if neg else val
+                n += 1
+                val = 0
+                digits = 0
+                neg = False
+                ended = False
+            elif c == 45 and digits == 0 and not neg:  # leading '-'
+                neg = True
+            elif c == 32 or c == 9 or c == 13 or c == 10:
+                ended = digits > 0
+            else:
+                return -1
+        if digits > 0:
+            if n == out.size:
+                return -1
+            out[n] = -val if neg else val
+            n += 1
+        elif neg:
+            return -1
+        return n
+else:
+    parse_codes = None
+
+def parse_frame(raw_line, channel_num, out=None):
+    """Parse one comma-separated frame of raw codes (bytes); None if it is malformed or the wrong length.
+
+    out, if given, is a reusable int64 buffer of at least channel_num + 1 entries.
+    """
+    if parse_codes is None:
+        try:
+            raw_vals = np.fromstring(raw_line, dtype=np.int64, sep=",")
+        except ValueError:  # NumPy 2 raises on unparseable tokens
+            return None
+        return raw_vals if raw_vals.size == channel_num else None
+    if out is None:
+        out = np.empty(channel_num + 1, dtype=np.int64)  # one spare slot to catch extra values
+    n = parse_codes(np.frombuffer(raw_line, dtype=np.uint8), out)
+    return out[:channel_num] if n == channel_num else None
+
+# -------------------------------
+# Serial reading
+# -------------------------------
+class SerialLineReader:
+    """Line reader that pulls everything waiting in one read instead of
+    pyserial's byte-at-a-time readline()."""
+
+    def __init__(self, ser, max_line=4096):
+        self.ser = ser
+        self.max_line = max_line
+        self._buf = bytearray()
+
+    def read_line(self):
+        """Return the next complete line (bytes, no newline), or b"" on timeout"""
+        while True:
+            nl = self._buf.find(b"\n")
+            if nl >= 0:
+                line = bytes(self._buf[:nl])
+                del self._buf[:nl + 1]
+                return line
+            if len(self._buf) > self.max_line:
+                # Noise without line breaks (e.g. baud mismatch): drop it rather than grow forever
+                self._buf.clear()
+                return b""
+            chunk = self.ser.read(max(1, self.ser.in_waiting))
+            if not chunk:
+                return b""
+            self._buf.extend(chunk)
+
+    def wait_for(self, marker, timeout, echo=None):
+        """Consume lines until one equals marker (bytes). Lines containing echo are printed.
+
+        Returns False if the marker did not show up within timeout seconds.
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            line = self.read_line().strip()
+            if line == marker:
+                return True
+            if echo and echo in line:
+                print(line.decode(errors="ignore"))
+        return False
+
+    def clear(self):
+        self._buf.clear()
+
+# -------------------------------
+# Logging
+# -------------------------------
+def choose_output_file(initialdir=None, topmost=False):
+    """Ask for a CSV path with a Tk save dialog.
+
+    Returns None if cancelled. Falls back to a timestamped file in ../data if the dialog fails.
+    """
+    default_name = f"capacitance_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    try:
+        import tkinter as tk
+        from tkinter import filedialog
+
+        root = tk.Tk()
+        root.withdraw()
+        if topmost:
+            root.attributes('-topmost', True)  # Bring to front on macOS
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            initialfile=default_name,
+            initialdir=initialdir,
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+            title="Select CSV file to log to"
+        )
+        root.update()  # Process events
+        root.destroy()
+        return file_path or None
+    except Exception as e:
+        print(f"[WARNING] Could not open file dialog: {e}")
+        default_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+        os.makedirs(default_dir, exist_ok=True)
+        file_path = os.path.join(default_dir, default_name)
+        print(f"[INFO] Using default filename: {file_path}")
+        return file_path
+
+class CsvLogger:
+    """CSV log written by its own thread from a queue, so the serial loop never touches the file.
+
+    start/stop may be called from another thread (e.g. GUI buttons) than write (the serial
+    loop): the lock makes a stop() wait out a write() in progress, so every row accepted before
+    stop() is in the queue when the writer drains it.
+    """
+
+    def __init__(self, header, buffering=1 << 20, batch_rows=64):
+        self.header = header
+        self.buffering = buffering
+        self.batch_rows = batch_rows
+        self.enabled = False
+        self._queue = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self, fname):
+        try:
+            f = open(fname, mode="w", newline="", buffering=self.buffering)
+        except Exception as e:
+            print(f"[ERROR] Could not open file: {e}")
+            return False
+        self._queue = queue.SimpleQueue()  # fresh queue: nothing left over from a previous log
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._writer, args=(f, self._queue), daemon=True)
+        self._thread.start()
+        with self._lock:
+            self.enabled = True
+        print(f"[INFO] Logging started to {fname}")
+        return True
+
+    def write(self, row):
+        with self._lock:
+            if self.enabled:
+                self._queue.put_nowait(row)
+
+    def _writer(self, f, rows):
+        try:
+            writer = csv.writer(f)
+            writer.writerow(self.header)
+            batch = []
+            while not self._stop.is_set() or not rows.empty():
+                try:
+                    batch.append(rows.get(timeout=0.1))
+                except queue.Empty:
+                    continue
+                # Take whatever else is already queued (up to batch_rows) and write it in one call;
+                # nothing is flushed until the file is closed
+                while len(batch) < self.batch_rows and not rows.empty():
+                    batch.append(rows.get_nowait())
+                writer.writerows(batch)
+                batch.clear()
+        except Exception as e:
+            print(f"[ERROR] Failed to write data: {e}")
+            self.enabled = False
+        finally:
+            f.close()
+
+    def stop(self):
+        with self._lock:
+            self.enabled = False  # no write() can queue a row after this
+        if self._thread is None:
+            print("[INFO] Logging stopped (no file was open)")
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        print("[INFO] Logging stopped and file closed.")
+
+# -------------------------------
+# Plotting
+# -------------------------------
+class LivePlotter:
+    """Single-axes plot of the last buffer_len frames, one line per channel.
+
+    Samples go into one (channel_num, buffer_len) ring via append()/extend(); the main
+    loop calls refresh() on its own timer.
+    Lines are drawn against the sample index so their x data only changes while the
+    buffer fills; the tick labels map each index back to its elapsed time.
+    """
+
+    def __init__(self, labels, title, ylabel="Capacitance (pF)", buffer_len=100,
+                 figsize=(10, 6), legend_ncol=1, full_redraw_s=1.0):
+        self.channel_num = len(labels)
+        self.buffer_len = buffer_len
+        self._t_ring = np.zeros(buffer_len)
+        self._y_ring = np.zeros((self.channel_num, buffer_len))
+        self._cursor = 0  # next slot to write
+        self._filled = 0
+        self.sample_count = 0  # lets refresh() skip idle redraws
+        self._last_drawn = -1
+
+        # Scratch arrays refresh() unrolls the ring into (oldest first), reused every refresh
+        self._t_scratch = np.empty(buffer_len)
+        self._y_scratch = np.empty((self.channel_num, buffer_len))
+        self._x_full = np.arange(buffer_len, dtype=np.float64)
+        self._slots = np.arange(buffer_len)
+        self._x_drawn = None  # x currently held by every line
+        self._n_drawn = 0
+
+        # Blitting: the axes (ticks, grid, legend) are cached and only the lines are redrawn;
+        # a full draw is forced on limit changes and every full_redraw_s so time ticks stay current
+        self.full_redraw_s = full_redraw_s
+        self._last_full = 0.0
+        self._bg = None
+
+        plt.ion()
+        self.fig, self.ax = plt.subplots(figsize=figsize)
+        self.fig.subplots_adjust(bottom=0.18)
+        self.lines = [self.ax.plot([], [], label=label, animated=True)[0] for label in labels]
+        self.ax.legend(loc='upper right', ncol=legend_ncol)
+        self.ax.set_xlabel("Time (s)")
+        self.ax.xaxis.set_major_formatter(FuncFormatter(self._format_time))
+        self.ax.set_ylabel(ylabel)
+        self.ax.set_title(title)
+        self.ax.grid(True, alpha=0.3)
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        """After every full draw (ours, a resize, a button): recapture the background, draw the lines"""
+        canvas = self.fig.canvas
+        if getattr(canvas, "supports_blit", False):
+            self._bg = canvas.copy_from_bbox(self.ax.bbox)
+        for line in self.lines:
+            self.ax.draw_artist(line)
+
+    def add_logging_buttons(self, on_start, on_stop):
+        ax_start = self.fig.add_axes([0.7, 0.02, 0.1, 0.05])
+        ax_stop = self.fig.add_axes([0.81, 0.02, 0.1, 0.05])
+        self.btn_start = Button(ax_start, "Start Logging")
+        self.btn_stop = Button(ax_stop, "Stop Logging")
+        self.btn_start.on_clicked(on_start)
+        self.btn_stop.on_clicked(on_stop)
+
+    def show_logging(self, on):
+        self.btn_start.label.set_text("Logging: ON" if on else "Start Logging")
+        self.btn_start.color = "lightgreen" if on else "0.85"
+        self.btn_start.hovercolor = self.btn_start.color
+        self.fig.canvas.draw_idle()
+
+    def append(self, elapsed, caps):
+        self._t_ring[self._cursor] = elapsed
+        self._y_ring[:, self._cursor] = caps
+        self._cursor = (self._cursor + 1) % self.buffer_len
+        self._filled = min(self._filled + 1, self.buffer_len)
+        self.sample_count += 1
+
+    def extend(self, rows):
+        """Append a block of (elapsed, cap_0 .. cap_n-1) rows in one vectorized write"""
+        m = len(rows)
+        if m == 0:
+            return
+        self.sample_count += m
+        if m > self.buffer_len:
+            rows = rows[-self.buffer_len:]
+            m = self.buffer_len
+        idx = (self._cursor + np.arange(m)) % self.buffer_len
+        self._t_ring[idx] = rows[:, 0]
+        self._y_ring[:, idx] = rows[:, 1:].T
+        self._cursor = (self._cursor + m) % self.buffer_len
+        self._filled = min(self._filled + m, self.buffer_len)
+
+    def _format_time(self, x, pos):
+        i = int(round(x))
+        if 0 <= i < self._n_drawn:
+            return f"{self._t_scratch[i]:.1f}"
+        return ""
+
+    def _decimate_index(self, n):
+        """Indices that thin n samples down to ~2 points per horizontal pixel (None if not needed)"""
+        max_points = 2 * max(int(self.ax.get_window_extent().width), 1)
+        if n <= max_points:
+            return None
+        return np.linspace(0, n - 1, max_points).astype(int)
+
+    def refresh(self):
+        """Push the buffered samples to the lines; no-op if nothing arrived since the last call"""
+        if self.sample_count == self._last_drawn:
+            return
+        self._last_drawn = self.sample_count
+
+        n = self._filled
+        if n < self.buffer_len:
+            # Not wrapped yet: slots 0..n-1 are already oldest-first
+            self._t_scratch[:n] = self._t_ring[:n]
+            self._y_scratch[:, :n] = self._y_ring[:, :n]
+        else:
+            order = (self._cursor + self._slots) % n
+            np.take(self._t_ring, order, out=self._t_scratch)
+            np.take(self._y_ring, order, axis=1, out=self._y_scratch)
+        self._n_drawn = n
+        x_vals = self._x_full[:n]
+        y_vals = self._y_scratch[:, :n]
+
+        idx = self._decimate_index(n)
+        if idx is not None:
+            x_vals = x_vals[idx]
+            y_vals = y_vals[:, idx]
+
+        # x only changes while the buffer fills (or the window is resized); otherwise touch y alone
+        x_changed = self._x_drawn is None or not np.array_equal(x_vals, self._x_drawn)
+        if x_changed:
+            self._x_drawn = x_vals.copy()
+            for line in self.lines:
+                line.set_xdata(self._x_drawn)
+            self.ax.set_xlim(0, max(n - 1, 1))
+        for i in range(self.channel_num):
+            self.lines[i].set_ydata(y_vals[i])
+
+        rescaled = n > 0 and self._track_ylim(y_vals.min(), y_vals.max())
+        now = time.perf_counter()
+        canvas = self.fig.canvas
+        if x_changed or rescaled or self._bg is None or now - self._last_full >= self.full_redraw_s:
+            # Full draw; _on_draw recaptures the background and paints the lines
+            self._last_full = now
+            canvas.draw_idle()
+        else:
+            canvas.restore_region(self._bg)
+            for line in self.lines:
+                self.ax.draw_artist(line)
+            canvas.blit(self.ax.bbox)
+
+    def _track_ylim(self, lo, hi):
+        """Move the y-limits only if the data left the view or it is >1.5x too loose; True if moved"""
+        pad = 0.05 * (hi - lo) or 1.0
+        cur_lo, cur_hi = self.ax.get_ylim()
+        outside = lo < cur_lo or hi > cur_hi
+        too_loose = (cur_hi - cur_lo) > 1.5 * (hi - lo + 2 * pad)
+        if not (outside or too_loose):
+            return False
+        self.ax.set_ylim(lo - pad, hi + pad)
+        return True
+
+# -------------------------------
+# Serial process + main loop
+# -------------------------------
+class SharedFrameRing:
+    """Ring of (elapsed, cap_0 .. cap_n-1) rows in shared memory.
+
+    One writer process pushes rows and then bumps head; the reader copies out
+    everything between its own tail and head. Pass attach_args() to the other
+    process to open the same ring there.
+    """
+
+    def __init__(self, width, capacity=4096, name=None, head=None):
+        self.width = width
+        self.capacity = capacity
+        self.shm = SharedMemory(name=name, create=name is None, size=capacity * width * 8)
+        self.rows = np.ndarray((capacity, width), dtype=np.float64, buffer=self.shm.buf)
+        # Single writer, so a plain int64 without a lock is enough
+        self.head = head if head is not None else mp.Value('q', 0, lock=False)
+
+    def attach_args(self):
+        return (self.width, self.capacity, self.shm.name, self.head)
+
+    def push_frame(self, raw, elapsed, k, c_fixed_pf=0.0):
+        """Convert a frame of raw codes straight into the next slot; returns that row"""
+        row = self.rows[self.head.value % self.capacity]
+        ingest_frame(raw, row, elapsed, k, c_fixed_pf)
+        self.head.value += 1
+        return row
+
+    def read_since(self, tail):
+        """Rows written since tail (at most capacity of them) and the new tail"""
+        head = self.head.value
+        tail = max(tail, head - self.capacity)
+        idx = np.arange(tail, head) % self.capacity
+        return self.rows[idx], head
+
+    def close(self, unlink=False):
+        del self.rows
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+def serial_process(port, baudrate, ring_args, commands, logging_flag, header,
+                   inductance=INDUCTANCE, c_fixed=0.0, max_silent_errors=10):
+    """Child process: read frames, convert to pF, push them to the shared ring and log to CSV.
+
+    commands carries ("start", fname), ("stop",) or None (exit) from the GUI process;
+    logging_flag mirrors whether a log file is actually open.
+    """
+    try:
+        ser = serial.Serial(port, baudrate, timeout=1)
+    except serial.SerialException as e:
+        print(f"[ERROR] Failed to open serial port {port}: {e}")
+        return
+    reader = SerialLineReader(ser)
+    ring = SharedFrameRing(*ring_args)
+    logger = CsvLogger(header)
+    channel_num = ring.width - 1
+    k = capacitance_constant(inductance)
+    c_fixed_pf = c_fixed * 1e12
+    codes = np.empty(channel_num + 1, dtype=np.int64)
+    t0 = time.perf_counter()  # monotonic, one clock read per frame
+    error_count = 0
+
+    try:
+        while True:
+            # GUI requests (cheap when empty)
+            while not commands.empty():
+                cmd = commands.get_nowait()
+                if cmd is None:
+                    return
+                if cmd[0] == "start" and not logger.enabled:
+                    logger.start(cmd[1])
+                elif cmd[0] == "stop":
+                    logger.stop()
+            logging_flag.value = logger.enabled
+
+            try:
+                raw_line = reader.read_line()
+                raw_vals = parse_frame(raw_line, channel_num, codes) if raw_line.strip() else None
+                if raw_vals is None:
+                    # Empty read (timeout) or malformed / incomplete line
+                    error_count += 1
+                    if error_count == max_silent_errors + 1:
+                        print("[WARNING] Repeated empty or malformed serial lines. Is device sending data?")
+                    continue
+
+                # Reset error counter on successful read
+                error_count = 0
+
+                elapsed = time.perf_counter() - t0
+                row = ring.push_frame(raw_vals, elapsed, k, c_fixed_pf)
+                logger.write(row.tolist())
+
+            except serial.SerialException as e:
+                print(f"[ERROR] Serial port error: {e}")
+                print("[INFO] Attempting to recover...")
+                time.sleep(1)
+                try:
+                    ser.close()
+                    time.sleep(0.5)
+                    ser.open()
+                    reader.clear()
+                    print("[INFO] Serial port reconnected")
+                except Exception as recovery_error:
+                    print(f"[ERROR] Failed to recover: {recovery_error}")
+                    time.sleep(2)
+            except Exception as e:
+                print(f"[ERROR] Serial error: {e}")
+                continue
+    finally:
+        logger.stop()
+        ring.close()
+        ser.close()
+        print("[INFO] Serial port closed")
+
+def run(port, baudrate, labels, title, ylabel="Capacitance (pF)", inductance=INDUCTANCE, c_fixed=0.0,
+        buffer_len=100, refresh_s=0.1, figsize=(10, 6), legend_ncol=1, dialog_dir=None,
+        dialog_topmost=False):
+    """Live-plot frames of len(labels) comma-separated raw codes from port, with Start/Stop CSV logging.
+
+    Serial reading and CSV writing run in a separate process so plotting never stalls them.
+    Callers must invoke this under `if __name__ == "__main__":`. Blocks until Ctrl+C or the
+    window loop ends, then stops the serial process.
+    """
+    plotter = LivePlotter(labels, title, ylabel, buffer_len, figsize, legend_ncol)
+    ring = SharedFrameRing(len(labels) + 1)
+    commands = mp.Queue()
+    logging_flag = mp.Value('b', 0, lock=False)
+    header = ["timestamp"] + [f"{label}_pF" for label in labels]
+
+    def start_logging(event):
+        if logging_flag.value:
+            print("[DEBUG] Logging already enabled, ignoring click")
+            return
+        fname = choose_output_file(dialog_dir, dialog_topmost)
+        if not fname:
+            print("[INFO] Logging cancelled (no file selected).")
+            return
+        commands.put(("start", fname))
+
+    def stop_logging(event):
+        commands.put(("stop",))
+
+    plotter.add_logging_buttons(start_logging, stop_logging)
+    print("[INFO] Logging system initialized. Click 'Start Logging' to begin data collection.")
+    plt.show(block=False)
+
+    proc = mp.Process(target=serial_process,
+                      args=(port, baudrate, ring.attach_args(), commands, logging_flag, header,
+                            inductance, c_fixed),
+                      daemon=True)
+    proc.start()
+
+    print("[INFO] Starting live plotting. Press Ctrl+C to exit.")
+    tail = 0
+    shown_logging = False
+    try:
+        while proc.is_alive():
+            rows, tail = ring.read_since(tail)
+            plotter.extend(rows)
+            if bool(logging_flag.value) != shown_logging:
+                shown_logging = bool(logging_flag.value)
+                plotter.show_logging(shown_logging)
+            plotter.refresh()
+            # Not plt.pause: it would redraw the whole (stale) figure every tick and defeat blitting
+            plotter.fig.canvas.flush_events()
+            plotter.fig.canvas.start_event_loop(refresh_s)
+        print("[ERROR] Serial process exited.")
+    except KeyboardInterrupt:
+        print("\n[INFO] Interrupted by user")
+    finally:
+        commands.put(None)
+        proc.join(timeout=3)
+        if proc.is_alive():
+            proc.terminate()
+        ring.close(unlink=True)
+        print("[INFO] Exiting.")
@@ -0,0 +1,167 @@
+"""
+postproc_core.py - shared pieces of the offline post-processing scripts
+Used by Post_Processing.py (load, align/smooth, trace and pose stats, plot decimation),
+Post_Processing_2.py (CSV loading) and Pose_Plotting.py (plot decimation)
+"""
+
+import functools
+import numpy as np
+import pandas as pd
+from scipy import signal
+
+# Numba is optional: without it the marker search below runs as plain NumPy
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# -------------------------------
+# Loading
+# -------------------------------
+def load_csv(filepath, usecols=None):
+    """Read a logged CSV in pandas' C reader; malformed lines are skipped and unparseable cells become NaN"""
+    return pd.read_csv(filepath, usecols=usecols, on_bad_lines="skip").apply(pd.to_numeric, errors="coerce")
+
+def load_repeat(filepath, channel):
+    """float32 (times from 0, values) of one channel, dropping rows with a bad cell; None if nothing is left"""
+    arr = load_csv(filepath, sorted({0, channel})).to_numpy()
+    arr = arr[~np.isnan(arr).any(axis=1)]  # the mask makes a writable copy (to_numpy may be a read-only view)
+    if len(arr) == 0:
+        return None
+    # Offset in place and in float64: absolute timestamps do not fit float32's precision
+    arr[:, 0] -= arr[0, 0]
+    arr = arr.astype(np.float32, order="F")  # column-major, so both returned columns are contiguous views
+    return arr[:, 0], arr[:, -1]  # same column when channel == 0
+
+# -------------------------------
+# Alignment and smoothing
+# -------------------------------
+def common_time_base(repeats):
+    """(common_t, dt): the time span every (times, vals) repeat covers, at the shortest repeat's sample count"""
+    t_min = max(rep[0][0] for rep in repeats)
+    t_max = min(rep[0][-1] for rep in repeats)
+    n_points = min(len(rep[0]) for rep in repeats)
+    return np.linspace(t_min, t_max, n_points, retstep=True, dtype=np.float32)  # dt: exact sample spacing
+
+@functools.lru_cache
+def savgol_kernel(wl):
+    """(kernel, left, right) for a polyorder-1 Savitzky-Golay filter of window wl.
+
+    kernel smooths the interior by convolution; left/right map the first/last wl samples
+    onto the first/last wl // 2 outputs, the straight-line edge fit of savgol_filter's "interp" mode.
+    """
+    half = wl // 2
+    kernel = signal.savgol_coeffs(wl, 1).astype(np.float32)
+    left = np.array([signal.savgol_coeffs(wl, 1, pos=p, use="dot") for p in range(half)], dtype=np.float32)
+    right = np.array([signal.savgol_coeffs(wl, 1, pos=p, use="dot") for p in range(wl - half, wl)],
+                     dtype=np.float32)
+    return kernel, left, right
+
+def smooth_onto(common_t, times, vals):
+    """One repeat interpolated onto common_t and Savitzky-Golay smoothed, kept in float32"""
+    n_points = common_t.size
+    wl = min(21, n_points if n_points % 2 == 1 else n_points - 1)
+    wl = max(3, wl)
+    kernel, left, right = savgol_kernel(wl)
+    half = wl // 2
+
+    trace = np.interp(common_t, times, vals).astype(np.float32)
+    smooth = np.empty_like(trace)
+    smooth[half:-half] = signal.oaconvolve(trace, kernel, mode="valid")  # FFT overlap-add
+    smooth[:half] = left @ trace[:wl]
+    smooth[-half:] = right @ trace[-wl:]
+    return smooth
+
+# -------------------------------
+# Trace and block statistics
+# -------------------------------
+def trace_stats(repeats, common_t, n_keep, block_samples, total_blocks):
+    """Smooth the repeats onto common_t and fold their first n_keep samples into running statistics.
+
+    Only one smoothed repeat is held at a time. Returns (sum_trace, min_trace, max_trace,
+    block_means, block_max, block_min); the block arrays are shaped (n_repeats, n_blocks)
+    and the last block may be partial.
+    """
+    blocks_end = min(n_keep, total_blocks * block_samples)
+    block_starts = np.arange(0, blocks_end, block_samples)
+    block_counts = np.diff(np.append(block_starts, blocks_end))
+
+    # float32 like the traces, except the block means: those sum thousands of samples
+    sum_trace = np.zeros(n_keep, dtype=np.float32)
+    min_trace = np.full(n_keep, np.inf, dtype=np.float32)
+    max_trace = np.full(n_keep, -np.inf, dtype=np.float32)
+    block_means = np.empty((len(repeats), block_starts.size))
+    block_max = np.empty(block_means.shape, dtype=np.float32)
+    block_min = np.empty(block_means.shape, dtype=np.float32)
+
+    for k, (t, v) in enumerate(repeats):
+        trace = smooth_onto(common_t, t, v)[:n_keep]
+        sum_trace += trace
+        np.minimum(min_trace, trace, out=min_trace)
+        np.maximum(max_trace, trace, out=max_trace)
+
+        # Per-block mean/max/min in one reduceat pass each
+        in_blocks = trace[:blocks_end]
+        block_means[k] = np.add.reduceat(in_blocks, block_starts, dtype=np.float64) / block_counts
+        block_max[k] = np.maximum.reduceat(in_blocks, block_starts)
+        block_min[k] = np.minimum.reduceat(in_blocks, block_starts)
+
+    return sum_trace, min_trace, max_trace, block_means, block_max, block_min
+
+def pose_block_stats(block_max, block_min):
+    """Absolute-extremum stats of the pose blocks (odd block indices) across repeats.
+
+    Takes the per-repeat block max/min of the ΔC traces; returns (pose_blocks, pose_vals, pose_stds).
+    """
+    # For each repeat, take the absolute extremum (max of |signal|)
+    extrema = np.where(np.abs(block_max) >= np.abs(block_min), block_max, block_min)
+    pose_blocks = np.arange(1, extrema.shape[1], 2)  # skip rest blocks including 0
+    return pose_blocks, extrema[:, pose_blocks].mean(axis=0), extrema[:, pose_blocks].std(axis=0)
+
+# -------------------------------
+# Plotting
+# -------------------------------
+def minmax_decimate(x, y, n_buckets):
+    """(x, y) thinned to the min and max sample of each of n_buckets equal runs, in order.
+
+    Peaks and valleys all survive, so a line drawn ~1 bucket per pixel column looks the same
+    as the full trace. A run containing NaN keeps a NaN, so gaps stay gaps. Short traces are
+    returned unchanged.
+    """
+    n = y.size
+    if n <= 2 * n_buckets:
+        return x, y
+    width = n // n_buckets
+    runs = y[:n_buckets * width].reshape(n_buckets, width)
+    offsets = np.arange(0, n_buckets * width, width)
+    idx = np.concatenate([offsets + runs.argmin(axis=1), offsets + runs.argmax(axis=1),
+                          np.arange(n_buckets * width, n)])  # the leftover tail is kept as is
+    idx.sort()
+    return x[idx], y[idx]
+
+if njit is not None:
+    @njit(cache=True)
+    def block_extremum_indices(trace, starts, width):
+        """Index into trace of the absolute extremum of each block trace[s:s + width]"""
+        out = np.empty(starts.size, dtype=np.int64)
+        for j in range(starts.size):
+            s = starts[j]
+            e = min(s + width, trace.size)
+            i_max = s
+            i_min = s
+            for k in range(s + 1, e):  # one pass for both argmax and argmin (first occurrence wins)
+                if trace[k] > trace[i_max]:
+                    i_max = k
+                if trace[k] < trace[i_min]:
+                    i_min = k
+            out[j] = i_max if abs(trace[i_max]) >= abs(trace[i_min]) else i_min
+        return out
+else:
+    def block_extremum_indices(trace, starts, width):
+        """Index into trace of the absolute extremum of each block trace[s:s + width]"""
+        out = np.empty(starts.size, dtype=np.int64)
+        for j, s in enumerate(starts):
+            block = trace[s:s + width]
+            i_max, i_min = np.argmax(block), np.argmin(block)
+            out[j] = s + (i_max if abs(block[i_max]) >= abs(block[i_min]) else i_min)
+        return out
@@ -64,11 +64,13 @@ def apply_ylim(ax):
         ax.set_ylim(Y_LIMITS)
 
 
-def plot_csv(csv_path: str, output_dir: str):
+def plot_csv(csv_path: str, output_dir: str, fig, ax):
     timestamps, channel_cols, channel_data = load_csv(csv_path)
     labels = [col.replace('_pF', '') for col in channel_cols]
 
-    fig, ax = plt.subplots(figsize=(14, 7))
+    ax.cla()
+    # Undo the previous tight_layout so every plot is laid out from the same start
+    fig.subplots_adjust(**{k: plt.rcParams[f"figure.subplot.{k}"] for k in ('left', 'right', 'bottom', 'top')})
     colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
 
     for idx, (col, label) in enumerate(zip(channel_cols, labels)):
@@ -82,13 +84,12 @@ def plot_csv(csv_path: str, output_dir: str):
     ax.grid(True, alpha=0.3)
     apply_ylim(ax)
 
-    plt.tight_layout()
+    fig.tight_layout()
 
     os.makedirs(output_dir, exist_ok=True)
     base = os.path.splitext(os.path.basename(csv_path))[0]
     out_path = os.path.join(output_dir, f"{base}.png")
-    plt.savefig(out_path, dpi=150, bbox_inches='tight')
-    plt.close(fig)
+    fig.savefig(out_path, dpi=150, bbox_inches='tight')
     print(f"[INFO] Saved plot -> {out_path}")
 
 
@@ -110,11 +111,14 @@ def main():
 
     print(f"[INFO] Found {len(files)} file(s) for {args.date}")
 
+    # One figure for every file, cleared between them
+    fig, ax = plt.subplots(figsize=(14, 7))
     for csv_path in files:
         try:
-            plot_csv(csv_path, output_dir)
+            plot_csv(csv_path, output_dir, fig, ax)
         except Exception as exc:
             print(f"[ERROR] Failed to plot {csv_path}: {exc}")
+    plt.close(fig)
 
 
 if __name__ == '__main__':
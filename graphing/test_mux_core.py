@@ -0,0 +1,51 @@
+"""
+test_mux_core.py - checks that the numba frame parser and the NumPy fallback agree
+Run with: python -m pytest graphing/test_mux_core.py
+"""
+
+import numpy as np
+import pytest
+
+import mux_core
+
+CHANNEL_NUM = 4
+
+# Well-formed frames, whitespace around and inside numbers, and malformed frames
+LINES = [
+    b"1,2,3,4",
+    b"1,2,3,4\r\n",
+    b" 1, 2 ,3,\t4 ",
+    b"1,2,3,4,",
+    b"1,2,3,4 ,",
+    b"-1,2,3,4",
+    b"- 1,2,3,4",
+    b"1 2,3,4,5",
+    b"1,2,3 4,5",
+    b"12,3\t4,5,6",
+    b"1,2,3,4\r5",
+    b"1,2,3",
+    b"1,2,3,4,5",
+    b"1,,3,4",
+    b"1,2,x,4",
+    b"",
+]
+
+
+@pytest.mark.skipif(mux_core.parse_codes is None, reason="numba is not installed")
+@pytest.mark.parametrize("line", LINES)
+def test_parse_frame_njit_matches_fallback(line, monkeypatch):
+    njit_vals = mux_core.parse_frame(line, CHANNEL_NUM)
+    monkeypatch.setattr(mux_core, "parse_codes", None)
+    fallback_vals = mux_core.parse_frame(line, CHANNEL_NUM)
+
+    if fallback_vals is None:
+        assert njit_vals is None
+    else:
+        assert njit_vals is not None
+        np.testing.assert_array_equal(njit_vals, fallback_vals)
+
+
+@pytest.mark.skipif(mux_core.parse_codes is None, reason="numba is not installed")
+@pytest.mark.parametrize("line", [b"1 2,3,4,5", b"1,2,3 4", b"1,2,3,4\t5"])
+def test_parse_frame_rejects_whitespace_inside_numbers(line):
+    assert mux_core.parse_frame(line, CHANNEL_NUM) is None